@@ -0,0 +1,283 @@
+# ==========================================================
+# Platinum Life Quote Audit Log
+# Append-only record of every quote issued and every quotation PDF
+# generated: client inputs, premium outputs, presenter details,
+# rate-table version and a UTC timestamp. Stored in a local SQLite
+# database in WAL mode. Callers only enqueue rows; a background
+# writer thread inserts them in batched transactions, so the UI
+# never waits on disk. Rows are indexed by presenter code + date.
+#
+# PREMIUM_RATER_AUDIT_DB sets the database path (default:
+# quote_audit.sqlite3 next to the app); set it empty to disable.
+# Usage: python audit_log.py PRESENTER_CODE [--month 2026-10]
+#            [--since 2026-10-01] [--until 2026-11-01]
+# ==========================================================
+
+import os
+import sys
+import csv
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+
+from rating_engine import BASE_PATH
+
+AUDIT_PATH = os.environ.get("PREMIUM_RATER_AUDIT_DB", os.path.join(BASE_PATH, "quote_audit.sqlite3"))
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5  # seconds a partial batch may wait
+QUEUE_SIZE = 100_000  # rows waiting for the writer; further rows are dropped and counted
+FLUSH_TIMEOUT = 10.0  # seconds flush() waits at exit
+
+logger = logging.getLogger("premium_rater.audit")
+
+# --- SCHEMA ---
+COLUMNS = [
+    "event", "created_at", "client_name", "age", "gender", "smoker", "education", "sum_assured",
+    "base", "phcf", "stamp", "total", "presenter_name", "distribution_channel", "presenter_code",
+    "rate_table_version", "pdf_sha256", "pdf_bytes", "pdf_document", "pdf_page",
+]
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY,
+    event TEXT NOT NULL,                -- 'quote', 'pdf' or 'pdf_document'
+    created_at TEXT NOT NULL,           -- ISO 8601 UTC
+    client_name TEXT, age INTEGER, gender TEXT, smoker TEXT, education TEXT, sum_assured REAL,
+    base REAL, phcf REAL, stamp REAL, total REAL,
+    presenter_name TEXT, distribution_channel TEXT, presenter_code TEXT,
+    rate_table_version TEXT,
+    pdf_sha256 TEXT, pdf_bytes INTEGER, -- PDF events only
+    pdf_document TEXT, pdf_page INTEGER -- page of a merged PDF; the 'pdf_document' row holds its hash
+);
+CREATE INDEX IF NOT EXISTS audit_presenter_date ON audit (presenter_code, created_at);
+CREATE INDEX IF NOT EXISTS audit_date ON audit (created_at);
+CREATE TRIGGER IF NOT EXISTS audit_no_update BEFORE UPDATE ON audit
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS audit_no_delete BEFORE DELETE ON audit
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+"""
+# Columns added after the first release; connect() adds them to older databases.
+ADDED_COLUMNS = {
+    "pdf_document": "TEXT",
+    "pdf_page": "INTEGER",
+}
+INTEGER_COLUMNS = {"age", "pdf_bytes", "pdf_page"}
+REAL_COLUMNS = {"sum_assured", "base", "phcf", "stamp", "total"}
+INSERT = f"INSERT INTO audit ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+def connect(path=AUDIT_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps the file consistent
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(audit)")}
+    for column, kind in ADDED_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE audit ADD COLUMN {column} {kind}")
+    return conn
+
+def table_version(table):
+    """Label of the rate table that priced a quote: registry name plus workbook checksum prefix."""
+    if table is None:
+        return ""
+    digest = table.checksum.hex()[:12] if table.checksum else ""
+    return f"{table.name}:{digest}" if table.name else digest
+
+def _coerce(column, value):
+    """`value` as the column's SQLite type, so no row can fail to bind; unusable numbers become NULL."""
+    if value is None:
+        return None
+    if column in INTEGER_COLUMNS or column in REAL_COLUMNS:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if number != number:  # NaN
+            return None
+        return int(number) if column in INTEGER_COLUMNS else number
+    return value if isinstance(value, str) else str(value)
+
+def audit_row(quote, event="quote", pdf=None, table=None, document=None, page=None):
+    """Audit tuple in COLUMNS order for a quote dict (QUOTE_DEFAULTS fields).
+
+    `pdf` is the delivered file's bytes; a page of a merged document instead names the
+    `document` and `page`, and the document's own row carries the hash.
+    """
+    row = {column: _coerce(column, quote.get(column)) for column in COLUMNS}
+    row["event"] = event
+    row["created_at"] = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+    row["rate_table_version"] = quote.get("rate_table_version") or table_version(table)
+    if pdf is not None:
+        row["pdf_sha256"] = hashlib.sha256(pdf).hexdigest()
+        row["pdf_bytes"] = len(pdf)
+    if document is not None:
+        row["pdf_document"] = document
+        row["pdf_page"] = page
+    return tuple(row[column] for column in COLUMNS)
+
+# --- BACKGROUND WRITER ---
+class AuditWriter:
+    """Queues audit rows and inserts them from a daemon thread in batches of up to `batch_size`."""
+
+    def __init__(self, path=AUDIT_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.disabled = False
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def record(self, row):
+        if self.disabled:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 10_000 == 0:
+                logger.error("audit queue is full; %d rows dropped so far", self.dropped)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error:
+            logger.exception("could not open audit log %s; audit logging is disabled", self.path)
+            self.disabled = True
+            self._drain()
+            return
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write(conn, batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, conn, batch):
+        for attempt in range(3):
+            try:
+                with conn:
+                    conn.executemany(INSERT, batch)
+                self.written += len(batch)
+                return
+            except sqlite3.OperationalError:  # e.g. locked by another worker process
+                time.sleep(0.5 * (attempt + 1))
+            except sqlite3.Error:  # a row that cannot be stored
+                if len(batch) > 1:
+                    for row in batch:  # keep every good row; only the bad one is lost
+                        self._write(conn, [row])
+                    return
+                break
+        self.failed += len(batch)
+        logger.error("could not write %d audit rows to %s", len(batch), self.path)
+
+    def _drain(self):
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self.dropped += 1
+            self._queue.task_done()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Waits until every queued row has been written (or has failed), for at most `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while self._thread is not None and self._thread.is_alive() and self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                logger.error("gave up waiting for %d audit rows", self._queue.unfinished_tasks)
+                return
+            time.sleep(0.05)
+
+
+writer = AuditWriter() if AUDIT_PATH else None
+
+def record_quote(quote, event="quote", pdf=None, table=None, document=None, page=None):
+    """Logs one issued quote (or generated PDF, with its bytes) without waiting on disk."""
+    if writer is not None:
+        writer.record(audit_row(quote, event, pdf, table, document, page))
+
+def record_document(document, path, table=None):
+    """Logs a merged PDF once it is complete: its hash and size, under the `document` id its pages name."""
+    if writer is None:
+        return
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    row = dict(zip(COLUMNS, audit_row({}, "pdf_document", table=table, document=document)))
+    row.update(client_name=os.path.basename(path), pdf_sha256=digest.hexdigest(), pdf_bytes=os.path.getsize(path))
+    writer.record(tuple(row[column] for column in COLUMNS))
+
+def record_quotes(quotes, table=None):
+    if writer is not None:
+        for quote in quotes:
+            writer.record(audit_row(quote, table=table))
+
+# --- QUERIES ---
+def quotes_by_presenter(presenter_code, since=None, until=None, path=AUDIT_PATH):
+    """Audit rows for `presenter_code` with since <= created_at < until (ISO date strings), oldest first."""
+    sql = f"SELECT {', '.join(COLUMNS)} FROM audit WHERE presenter_code = ?"
+    params = [presenter_code]
+    if since:
+        sql += " AND created_at >= ?"
+        params.append(since)
+    if until:
+        sql += " AND created_at < ?"
+        params.append(until)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute(sql + " ORDER BY created_at", params).fetchall()
+    finally:
+        conn.close()
+
+def month_range(month):
+    """'2026-10' -> ('2026-10-01', '2026-11-01')."""
+    year, number = map(int, month.split("-"))
+    year_after, month_after = (year + 1, 1) if number == 12 else (year, number + 1)
+    return f"{year:04d}-{number:02d}-01", f"{year_after:04d}-{month_after:02d}-01"
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export audited quotes for one presenter as CSV.")
+    parser.add_argument("presenter_code")
+    parser.add_argument("--month", help="calendar month, e.g. 2026-10")
+    parser.add_argument("--since", help="first date (inclusive), e.g. 2026-10-01")
+    parser.add_argument("--until", help="last date (exclusive)")
+    parser.add_argument("--db", default=AUDIT_PATH, help="audit database (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    since, until = month_range(args.month) if args.month else (args.since, args.until)
+    start = time.perf_counter()
+    rows = quotes_by_presenter(args.presenter_code, since, until, args.db)
+    out = csv.writer(sys.stdout)
+    out.writerow(COLUMNS)
+    out.writerows(rows)
+    print(f"{len(rows):,} rows in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
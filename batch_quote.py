@@ -0,0 +1,235 @@
+# ==========================================================
+# Platinum Life Batch Quoting
+# Quotes every row of a client portfolio (CSV/XLSX) in one
+# vectorized pass against the rate table. Rows that cannot be
+# quoted are flagged in an `error` column instead of aborting.
+# With --chunksize the input is streamed in fixed-size chunks and
+# appended to CSV/Parquet, so memory stays flat for any file size.
+# Usage: python batch_quote.py clients.xlsx -o quotes.csv
+#        python batch_quote.py book.csv -o book.parquet --chunksize 100000
+# ==========================================================
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import rating_engine
+import rate_registry
+
+# --- COLUMN MAPPING ---
+INPUT_COLUMNS = ["age", "gender", "smoker", "education", "sum_assured"]
+CATEGORY_COLUMNS = ["gender", "smoker", "education"]
+NUMERIC_COLUMNS = ["age", "sum_assured"]
+HEADER_ALIASES = {
+    "age_(last_birthday)": "age",
+    "smoker_status": "smoker",
+    "education_level": "education",
+}
+OUTPUT_COLUMNS = {
+    "base": "base_premium",
+    "phcf": "phcf_levy",
+    "stamp": "stamp_duty",
+    "total": "total_premium",
+    "error": "error",
+}
+
+def normalize_header(name):
+    key = str(name).strip().lower().replace(" ", "_")
+    return HEADER_ALIASES.get(key, key)
+
+def text_columns(columns):
+    """Every column except the numeric inputs; streamed chunks read these as text so their type cannot drift."""
+    return [column for column in columns if normalize_header(column) not in NUMERIC_COLUMNS]
+
+def resolve_columns(df):
+    """Maps each required input field to the matching column in `df`."""
+    columns = {normalize_header(column): column for column in df.columns}
+    missing = [name for name in INPUT_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Input is missing column(s): {', '.join(missing)}")
+    return {name: columns[name] for name in INPUT_COLUMNS}
+
+# --- QUOTING ---
+def normalize_category(values):
+    """Category text as the rating engine matches it ("female " -> "Female"); missing -> ""."""
+    return values.astype("string").str.strip().str.title().fillna("")
+
+def quote_frame(df, table=None):
+    """Returns a copy of `df` with premium and error columns appended."""
+    columns = resolve_columns(df)
+    inputs = {}
+    for name, column in columns.items():
+        if name in CATEGORY_COLUMNS:
+            inputs[name] = normalize_category(df[column]).to_numpy(dtype=object)
+        else:
+            inputs[name] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    result = rating_engine.quote_batch(**inputs, table=table)
+
+    quoted = df.copy()
+    for key, name in OUTPUT_COLUMNS.items():
+        quoted[name] = result[key]
+    return quoted
+
+# --- FILE I/O ---
+def is_excel(path):
+    return os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm", ".xls")
+
+def read_table(path):
+    return pd.read_excel(path) if is_excel(path) else pd.read_csv(path)
+
+def write_table(df, path):
+    if is_excel(path):
+        df.to_excel(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def iter_chunks(path, chunksize):
+    """Yields the input as DataFrames of at most `chunksize` rows.
+
+    Columns other than age and sum assured are read as text (blanks stay missing), so
+    a column that looks numeric in early chunks keeps one type for the whole file.
+    """
+    if is_excel(path):
+        yield from _iter_excel_chunks(path, chunksize)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dict.fromkeys(text_columns(header), str))
+
+def _iter_excel_chunks(path, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        text = [index for index, column in enumerate(header) if normalize_header(column) not in NUMERIC_COLUMNS]
+        batch = []
+        for row in rows:
+            row = list(row)
+            for index in text:
+                if row[index] is not None and not isinstance(row[index], str):
+                    row[index] = str(row[index])
+            batch.append(row)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+def parquet_frame(df):
+    """`df` with one fixed type per column, so every chunk matches the schema of the first.
+
+    Numeric inputs and premiums are float64 (unusable inputs are already flagged in
+    `error`); everything else is a nullable string.
+    """
+    numeric = set(NUMERIC_COLUMNS) | {OUTPUT_COLUMNS[key] for key in ("base", "phcf", "stamp", "total")}
+    return pd.DataFrame({column: pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+                         if normalize_header(column) in numeric else df[column].astype("string")
+                         for column in df.columns}, index=df.index)
+
+class ChunkWriter:
+    """Appends DataFrame chunks to a CSV file, or to Parquet when pyarrow is installed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = os.path.splitext(path)[1].lower() == ".parquet"
+        self._writer = None
+        self._schema = None
+        if self.parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Parquet output requires pyarrow; write to .csv instead") from None
+        elif is_excel(path):
+            raise ValueError("Streaming output must be .csv or .parquet")
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            df = parquet_frame(df)
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        else:
+            first = self._writer is None
+            if first:
+                self._writer = open(self.path, "w", newline="", encoding="utf-8")
+            df.to_csv(self._writer, index=False, header=first)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+# --- STREAMING ---
+def quote_stream(input_path, output_path, chunksize, table=None, progress=None):
+    """Quotes `input_path` chunk by chunk into `output_path`; returns (rows, flagged).
+
+    `progress`, if given, is called after every chunk with (rows, flagged, elapsed seconds).
+    """
+    if table is None:
+        table = rating_engine.load_rate_table()
+    writer = ChunkWriter(output_path)
+    rows = flagged = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            quoted = quote_frame(chunk, table)
+            writer.write(quoted)
+            rows += len(quoted)
+            flagged += int((quoted["error"] != "").sum())
+            if progress:
+                progress(rows, flagged, time.perf_counter() - start)
+    finally:
+        writer.close()
+    return rows, flagged
+
+def print_progress(rows, flagged, elapsed):
+    rate = rows / elapsed if elapsed else 0.0
+    print(f"  {rows:>12,} rows  {flagged:>10,} flagged  {rate:>12,.0f} rows/s", file=sys.stderr)
+
+def default_output_path(input_path):
+    stem, _ = os.path.splitext(input_path)
+    return f"{stem}_quotes.csv"
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quote every client in a CSV/XLSX portfolio.")
+    parser.add_argument("input", help="CSV or XLSX file with age, gender, smoker, education and sum_assured columns")
+    parser.add_argument("-o", "--output", help="CSV, XLSX or Parquet file to write (default: <input>_quotes.csv)")
+    parser.add_argument("--rates", help="rates workbook to quote against (default: the registry version in force)")
+    parser.add_argument("--chunksize", type=int, help="stream the input in chunks of this many rows (CSV/Parquet output)")
+    args = parser.parse_args(argv)
+    output = args.output or default_output_path(args.input)
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize must be a positive number of rows")
+
+    start = time.perf_counter()
+    table = rating_engine.load_rate_table(args.rates) if args.rates else rate_registry.current_table(watch=False)
+    try:
+        if args.chunksize:
+            rows, flagged = quote_stream(args.input, output, args.chunksize, table, progress=print_progress)
+        else:
+            quoted = quote_frame(read_table(args.input), table)
+            write_table(quoted, output)
+            rows, flagged = len(quoted), int((quoted["error"] != "").sum())
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - start
+
+    print(f"Quoted {rows - flagged:,} of {rows:,} rows ({flagged:,} flagged) "
+          f"in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s) -> {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# ==========================================================
+# Cold-import benchmark for the headless rating engine
+# Starts a fresh interpreter per run, imports the engine and PDF
+# modules, loads the rate table, and checks no UI/PDF dependency
+# was pulled in eagerly.
+# Usage: python benchmarks/bench_import.py [runs] [budget_ms]
+# ==========================================================
+
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["streamlit", "reportlab", "PIL", "openpyxl", "pandas"]
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import rating_engine, quotation_pdf
+imported = time.perf_counter()
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+rating_engine.load_rate_table()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "load_ms": (time.perf_counter() - imported) * 1000,
+    "loaded": loaded,
+}}))
+"""
+
+def measure():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 250.0
+
+    results = [measure() for _ in range(runs)]
+    best = min(r["import_ms"] for r in results)
+    load = min(r["load_ms"] for r in results)
+    loaded = sorted({m for r in results for m in r["loaded"]})
+
+    print(f"cold import   {best:8.1f} ms (best of {runs}, budget {budget_ms:.0f} ms)")
+    print(f"rate table    {load:8.1f} ms (snapshot load, best of {runs})")
+    print(f"heavy modules {', '.join(loaded) if loaded else 'none'}")
+    if loaded or best > budget_ms:
+        sys.exit(1)
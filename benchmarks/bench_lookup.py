@@ -0,0 +1,63 @@
+# ==========================================================
+# Per-quote rate lookup micro-benchmark
+# Compares the original boolean DataFrame scan against the
+# precomputed array lookup now used by calculate_premium.
+# Usage: python benchmarks/bench_lookup.py [iterations]
+# ==========================================================
+
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rating_engine  # noqa: E402
+
+df = pd.read_excel(rating_engine.DATA_PATH)
+table = rating_engine.load_rate_table()
+
+# --- ORIGINAL IMPLEMENTATION (for comparison only) ---
+def legacy_calculate_premium(age, gender, smoker, education, sum_assured):
+    rate_row = df[df['Age'] == age]
+    if rate_row.empty:
+        return 0, 0, 0, 0
+    rate = rate_row[f"{gender} {smoker} {education}"].values[0]
+    base = (rate / 1000) * sum_assured
+    phcf = 0.0025 * base
+    stamp = 40
+    total = base + phcf + stamp
+    return base, phcf, stamp, total
+
+# --- QUOTES TO CYCLE THROUGH ---
+QUOTES = [
+    (age, gender, smoker, education, 5_000_000)
+    for age in (18, 30, 42, 55)
+    for gender in rating_engine.GENDERS
+    for smoker in rating_engine.SMOKER_STATUSES
+    for education in rating_engine.EDUCATION_LEVELS
+]
+
+def indexed_calculate_premium(age, gender, smoker, education, sum_assured):
+    return rating_engine.calculate_premium(age, gender, smoker, education, sum_assured, table)
+
+def run(func):
+    for quote in QUOTES:
+        func(*quote)
+
+def bench(label, func, iterations):
+    seconds = min(timeit.repeat(lambda: run(func), number=iterations, repeat=5))
+    per_quote_us = seconds / (iterations * len(QUOTES)) * 1e6
+    print(f"{label:<10} {per_quote_us:10.2f} µs/quote")
+    return per_quote_us
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    for quote in QUOTES:
+        assert abs(legacy_calculate_premium(*quote)[3] - indexed_calculate_premium(*quote)[3]) < 1e-9
+
+    before = bench("before", legacy_calculate_premium, iterations)
+    after = bench("after", indexed_calculate_premium, iterations)
+    print(f"speed-up   {before / after:10.1f}x")
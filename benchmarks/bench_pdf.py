@@ -0,0 +1,49 @@
+# ==========================================================
+# Quotation PDF rendering benchmark
+# "before" clears the logo cache ahead of every render, which
+# reproduces the old decode-and-encode-per-PDF behaviour; "after"
+# reuses the cached logo XObject.
+# Usage: python benchmarks/bench_pdf.py [renders]
+# ==========================================================
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quotation_pdf  # noqa: E402
+
+QUOTE = {
+    "client_name": "Jane Wanjiru", "age": 34, "gender": "Female", "smoker": "Non Smoker",
+    "education": "Tertiary", "sum_assured": 5_000_000, "base": 1973.45, "phcf": 4.93,
+    "stamp": 40, "total": 2018.38, "presenter_name": "John Otieno",
+    "distribution_channel": "Agency", "presenter_code": "AG-0042",
+}
+
+def render(cold):
+    if cold:
+        quotation_pdf._logo_cache.clear()
+    return quotation_pdf.render_quotation_pdf(QUOTE).getbuffer().nbytes
+
+def bench(label, cold, renders):
+    render(cold)  # warm up imports
+    start = time.perf_counter()
+    for _ in range(renders):
+        size = render(cold)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    render(cold)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<8} {renders / elapsed:8.1f} PDFs/s  {peak / 1024:9.1f} KiB peak alloc/PDF  {size / 1024:7.1f} KiB file")
+    return renders / elapsed
+
+if __name__ == "__main__":
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    before = bench("before", True, renders)
+    after = bench("after", False, renders)
+    print(f"speed-up {after / before:8.1f}x")
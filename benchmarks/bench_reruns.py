@@ -0,0 +1,74 @@
+# ==========================================================
+# Streamlit rerun benchmark for the form -> quotation flow
+# Drives the app headlessly with Streamlit's AppTest harness and
+# counts the script reruns a browser would trigger. Widgets inside
+# an st.form only stage their value until the form is submitted,
+# so they cost no rerun; everything else reruns the whole script.
+# The PDF download button ignores clicks (the PDF is rendered in the
+# background as the quotation page opens), so it is not a step.
+# Usage: python benchmarks/bench_reruns.py [app_script]
+# ==========================================================
+
+import os
+import sys
+import time
+import logging
+
+from streamlit.testing.v1 import AppTest
+
+os.environ["PREMIUM_RATER_AUDIT_DB"] = ""  # synthetic quotes must not reach the append-only audit log
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (element kind, label, value) -- value None means click
+FLOW = [
+    ("text_input", "Client Name", "Jane Wanjiru"),
+    ("number_input", "Age (Last Birthday)", 34),
+    ("selectbox", "Gender", "Female"),
+    ("selectbox", "Smoker Status", "Non Smoker"),
+    ("selectbox", "Education Level", "Tertiary"),
+    ("number_input", "Sum Assured (1,000,000 – 35,000,000)", 5_000_000),
+    ("text_input", "Presenter Name", "John Otieno"),
+    ("text_input", "Distribution Channel", "Agency"),
+    ("text_input", "Presenter Code", "AG-0042"),
+    ("button", "Generate Quotation", None),
+]
+
+def find(at, kind, label):
+    return next(widget for widget in getattr(at, kind) if widget.label == label)
+
+def walk(script):
+    """Runs the flow once; returns [(step, ms)] for every step that reran the script."""
+    at = AppTest.from_file(script, default_timeout=60)
+    reruns = []
+
+    def rerun(step):
+        start = time.perf_counter()
+        at.run()
+        reruns.append((step, (time.perf_counter() - start) * 1000))
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+    rerun("page load")
+    for kind, label, value in FLOW:
+        widget = find(at, kind, label)
+        if value is None:
+            widget.click()
+        else:
+            widget.set_value(value)
+            if widget.proto.form_id:
+                continue  # staged in the browser until the form is submitted
+        rerun(label)
+    return reruns
+
+if __name__ == "__main__":
+    script = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else os.path.join(ROOT, "premium_rater.py")
+    logging.disable(logging.WARNING)  # AppTest logs bare-mode warnings on import
+
+    walk(script)  # warm process-wide caches, as on a long-running server
+    reruns = walk(script)
+
+    for step, ms in reruns:
+        print(f"  {step:<40} {ms:8.1f} ms")
+    total = sum(ms for _, ms in reruns)
+    print(f"{len(reruns)} reruns, {total:.1f} ms server time, {total / len(reruns):.1f} ms/rerun")
@@ -0,0 +1,206 @@
+# ==========================================================
+# Multi-session load harness for the Streamlit app
+# Runs N concurrent headless sessions (Streamlit's AppTest) through
+# form -> quotation -> PDF download and reports flow throughput,
+# per-step latency percentiles, process RSS growth per session and
+# the deep size of each session's st.session_state. Keys still
+# holding PDF bytes, buffers, futures or anything larger than
+# --retain-threshold after the download are flagged as retained.
+#
+# AppTest installs a process-global mock Runtime for every run, so
+# script runs are serialized behind a lock; sessions still overlap
+# (N stay alive, their PDFs render on the shared pool while other
+# sessions run). Latencies include the wait for that lock, much as
+# server script threads queue for the GIL.
+# Usage: python benchmarks/load_sessions.py [--sessions 50]
+#            [--concurrency 10] [--retain-threshold 16384] [-o results.json]
+# ==========================================================
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+os.environ["PREMIUM_RATER_AUDIT_DB"] = ""  # synthetic quotes must not reach the append-only audit log
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_reruns import find  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "premium_rater.py")
+PDF_TIMEOUT = 30
+RETAINED_TYPES = (bytes, bytearray, BytesIO, Future)
+
+_run_lock = threading.Lock()
+
+def client(number):
+    """Distinct but on-grid client details per session, so PDFs are not all cache hits."""
+    return [
+        ("text_input", "Client Name", f"Load Test Client {number}"),
+        ("number_input", "Age (Last Birthday)", 18 + number % 38),
+        ("selectbox", "Gender", ["Male", "Female"][number % 2]),
+        ("selectbox", "Smoker Status", ["Smoker", "Non Smoker"][number // 2 % 2]),
+        ("number_input", "Sum Assured (1,000,000 – 35,000,000)", 1_000_000 + number % 69 * 500_000),
+        ("text_input", "Presenter Name", "Load Test"),
+        ("text_input", "Distribution Channel", "Agency"),
+        ("text_input", "Presenter Code", f"LT-{number % 10:03d}"),
+    ]
+
+# --- MEMORY ---
+def process_rss():
+    """Resident set size of this process in bytes (Linux /proc, else peak RSS from getrusage)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def deep_sizeof(value, seen=None):
+    """Approximate retained bytes of `value`, following containers and finished futures."""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    elif isinstance(value, BytesIO):
+        size += value.getbuffer().nbytes
+    elif isinstance(value, Future) and value.done() and not value.exception():
+        size += deep_sizeof(value.result(), seen)
+    return size
+
+def holds_retained_type(value):
+    if isinstance(value, RETAINED_TYPES):
+        return True
+    if isinstance(value, (list, tuple)):
+        return any(holds_retained_type(item) for item in value)
+    return False
+
+# --- SESSION FLOW ---
+def walk(number):
+    """One session through the flow; returns step timings and its post-download session state."""
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    timings = {}
+
+    def run_script():
+        with _run_lock:
+            at.run()
+
+    def step(name, action):
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"session {number}, {name}: {at.exception[0].message}")
+
+    step("form_load", run_script)
+    for kind, label, value in client(number):
+        find(at, kind, label).set_value(value)
+    find(at, "button", "Generate Quotation").click()
+    step("generate_quotation", run_script)
+
+    def wait_for_pdf():
+        job = at.session_state["pdf_job"]
+        if job[1] is None:  # render pool was full; the page retries on its next run
+            deadline = time.perf_counter() + PDF_TIMEOUT
+            while job[1] is None and time.perf_counter() < deadline:
+                time.sleep(0.05)
+                run_script()
+                job = at.session_state["pdf_job"]
+        pdf = job[1].result(timeout=PDF_TIMEOUT)
+        if not pdf.startswith(b"%PDF"):
+            raise RuntimeError(f"session {number}: download is not a PDF")
+
+    step("pdf_ready", wait_for_pdf)
+    timings["flow"] = sum(timings.values())
+    return timings, at.session_state.to_dict(), at
+
+def session_report(state, threshold):
+    """Deep size of a session's state and the keys flagged as retained after download."""
+    sizes = {key: deep_sizeof(value) for key, value in state.items()}
+    retained = sorted(key for key, value in state.items()
+                      if holds_retained_type(value) or sizes[key] > threshold)
+    return sum(sizes.values()), {key: sizes[key] for key in retained}
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run(sessions, concurrency, threshold):
+    walk(0)  # warm imports, the rate table, grid and logo, as on a running server
+    rss_before = process_rss()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(walk, range(1, sessions + 1)))
+    elapsed = time.perf_counter() - start
+    rss_after = process_rss()  # every AppTest (session) is still alive here
+
+    steps = {name: [timings[name] for timings, _, _ in results] for name in results[0][0]}
+    reports = [session_report(state, threshold) for _, state, _ in results]
+    retained = {}
+    for _, keys in reports:
+        for key, size in keys.items():
+            count, total = retained.get(key, (0, 0))
+            retained[key] = (count + 1, total + size)
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "elapsed_seconds": elapsed,
+        "flows_per_second": sessions / elapsed,
+        "latency_ms": {name: {q: percentile(values, p) * 1000 for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+                       for name, values in steps.items()},
+        "rss_before_bytes": rss_before,
+        "rss_after_bytes": rss_after,
+        "rss_per_session_bytes": (rss_after - rss_before) / sessions,
+        "session_state_bytes": {"mean": sum(size for size, _ in reports) / sessions,
+                                "max": max(size for size, _ in reports)},
+        "retained_after_download": {key: {"sessions": count, "mean_bytes": total / count}
+                                    for key, (count, total) in sorted(retained.items())},
+    }
+
+def print_report(report):
+    print(f"{report['sessions']} sessions, concurrency {report['concurrency']}: "
+          f"{report['flows_per_second']:.1f} flows/s ({report['elapsed_seconds']:.1f} s)")
+    for name, q in report["latency_ms"].items():
+        print(f"  {name:<20} p50 {q['p50']:8.1f} ms   p95 {q['p95']:8.1f} ms   p99 {q['p99']:8.1f} ms")
+    mib = 1024 * 1024
+    print(f"  process RSS {report['rss_before_bytes'] / mib:,.1f} -> {report['rss_after_bytes'] / mib:,.1f} MiB "
+          f"({report['rss_per_session_bytes'] / 1024:,.1f} KiB per session)")
+    state = report["session_state_bytes"]
+    print(f"  session_state mean {state['mean'] / 1024:,.1f} KiB, max {state['max'] / 1024:,.1f} KiB")
+    for key, info in report["retained_after_download"].items():
+        print(f"  RETAINED {key!r} in {info['sessions']} sessions, {info['mean_bytes'] / 1024:,.1f} KiB each")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent app sessions and report throughput and memory.")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--retain-threshold", type=int, default=16 * 1024,
+                        help="flag session_state keys larger than this many bytes (default: 16384)")
+    parser.add_argument("-o", "--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # AppTest logs bare-mode warnings
+    report = run(args.sessions, args.concurrency, args.retain_threshold)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
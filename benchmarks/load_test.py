@@ -0,0 +1,113 @@
+# ==========================================================
+# Load test for the local rating service
+# Keeps N keep-alive connections busy against localhost and reports
+# requests/second and p50/p99 latency. Uses only asyncio streams,
+# so it adds no client dependency.
+# Usage: python benchmarks/load_test.py [--spawn] [--endpoint quote|quotes|pdf]
+#            [--concurrency 32] [--requests 5000] [--batch 100]
+# ==========================================================
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLIENT = {
+    "client_name": "Jane Wanjiru", "age": 34, "gender": "Female", "smoker": "Non Smoker",
+    "education": "Tertiary", "sum_assured": 5_000_000, "presenter_name": "John Otieno",
+    "distribution_channel": "Agency", "presenter_code": "AG-0042",
+}
+
+def request_body(endpoint, batch):
+    if endpoint == "quote":
+        return "/quote", CLIENT
+    if endpoint == "pdf":
+        return "/quote", {**CLIENT, "include_pdf": True}
+    clients = [{**CLIENT, "age": 18 + i % 38, "sum_assured": 1_000_000 + (i % 69) * 500_000} for i in range(batch)]
+    return "/quotes", {"clients": clients}
+
+async def post(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+async def connection(host, port, path, body, remaining, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            status = await post(reader, writer, host, path, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+async def run(host, port, path, body, concurrency, total):
+    remaining, latencies, statuses = [total], [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(connection(host, port, path, body, remaining, latencies, statuses)
+                           for _ in range(concurrency)))
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"service did not start on {host}:{port}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the local rating service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--endpoint", choices=["quote", "quotes", "pdf"], default="quote")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=100, help="clients per /quotes request")
+    parser.add_argument("--spawn", action="store_true", help="start rating_service.py for the duration of the test")
+    parser.add_argument("--workers", type=int, default=1, help="service workers when spawning")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        env = dict(os.environ, PREMIUM_RATER_AUDIT_DB="")  # keep synthetic quotes out of the audit log
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "rating_service.py"), "--host", args.host,
+                                   "--port", str(args.port), "--workers", str(args.workers)], env=env)
+    try:
+        wait_for_port(args.host, args.port)
+        path, payload = request_body(args.endpoint, args.batch)
+        body = json.dumps(payload).encode("utf-8")
+        asyncio.run(run(args.host, args.port, path, body, args.concurrency, min(args.requests, 200)))  # warm up
+        elapsed, latencies, statuses = asyncio.run(
+            run(args.host, args.port, path, body, args.concurrency, args.requests))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.endpoint}: {len(latencies):,} requests, concurrency {args.concurrency}, statuses {statuses}")
+    print(f"  {len(latencies) / elapsed:10,.0f} req/s")
+    print(f"  p50 {percentile(latencies, 0.50) * 1000:8.2f} ms   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms")
@@ -0,0 +1,179 @@
+# ==========================================================
+# Offline benchmark suite
+# Measures workbook parsing, rate-table loading, single, grid and
+# batch quoting, PDF rendering and full Streamlit page runs, and writes
+# the results as JSON. --compare flags metrics that regressed
+# against a stored baseline by more than --tolerance.
+# Usage: python benchmarks/run.py [-o results.json]
+#        python benchmarks/run.py --save-baseline
+#        python benchmarks/run.py --compare [benchmarks/baseline.json] [--tolerance 0.25]
+# ==========================================================
+
+import os
+import sys
+import json
+import time
+import timeit
+import logging
+import platform
+import argparse
+import tracemalloc
+
+os.environ["PREMIUM_RATER_AUDIT_DB"] = ""  # synthetic quotes must not reach the append-only audit log
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import numpy as np  # noqa: E402
+
+import rating_engine  # noqa: E402
+import quotation_pdf  # noqa: E402
+import premium_grid  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+APP_PATH = os.path.join(ROOT, "premium_rater.py")
+
+QUOTE = {
+    "client_name": "Jane Wanjiru", "age": 34, "gender": "Female", "smoker": "Non Smoker",
+    "education": "Tertiary", "sum_assured": 5_000_000, "base": 1973.45, "phcf": 4.93,
+    "stamp": 40, "total": 2018.38, "presenter_name": "John Otieno",
+    "distribution_channel": "Agency", "presenter_code": "AG-0042",
+}
+
+def metric(value, unit, better="lower"):
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+def best_ms(func, repeat=5, number=1):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+# --- BENCHMARKS ---
+def bench_workbook():
+    import pandas as pd
+
+    return {
+        "workbook_read_excel": metric(best_ms(lambda: pd.read_excel(rating_engine.DATA_PATH), repeat=3), "ms"),
+        "rate_table_open": metric(best_ms(lambda: rating_engine.open_rate_table(rating_engine.DATA_PATH)), "ms"),
+    }
+
+def bench_quotes():
+    table = rating_engine.load_rate_table()
+    single = best_ms(lambda: rating_engine.calculate_premium(34, "Female", "Non Smoker", "Tertiary", 5_000_000, table),
+                     number=10_000)
+    grid = premium_grid.grid_for(table, export=False)
+    lookup = best_ms(lambda: grid.lookup(34, "Female", "Non Smoker", "Tertiary", 5_000_000), number=10_000)
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    columns = {
+        "age": rng.integers(rating_engine.MIN_ENTRY_AGE, rating_engine.MAX_ENTRY_AGE + 1, n),
+        "gender": rng.choice(rating_engine.GENDERS, n).astype(object),
+        "smoker": rng.choice(rating_engine.SMOKER_STATUSES, n).astype(object),
+        "education": rng.choice(rating_engine.EDUCATION_LEVELS, n).astype(object),
+        "sum_assured": rng.integers(2, 71, n) * rating_engine.SUM_ASSURED_STEP,
+    }
+    batch = best_ms(lambda: rating_engine.quote_batch(**columns, table=table), repeat=3)
+    return {
+        "calculate_premium": metric(single * 1000, "us"),
+        "grid_lookup": metric(lookup * 1000, "us"),
+        "grid_build": metric(best_ms(lambda: premium_grid.build_grid(table)), "ms"),
+        "comparison": metric(best_ms(lambda: premium_grid.compare(table, 34, 5_000_000), number=1000) * 1000, "us"),
+        "quote_batch_100k": metric(batch, "ms"),
+    }
+
+def bench_pdf(renders=50):
+    quotation_pdf.render_quotation_pdf(QUOTE)
+    start = time.perf_counter()
+    for _ in range(renders):
+        quotation_pdf.render_quotation_pdf(QUOTE)
+    per_second = renders / (time.perf_counter() - start)
+
+    tracemalloc.start()
+    quotation_pdf.render_quotation_pdf(QUOTE)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "generate_pdf_throughput": metric(per_second, "pdf/s", better="higher"),
+        "generate_pdf_peak_alloc": metric(peak / 1024, "KiB"),
+    }
+
+def bench_pages(runs=5):
+    from streamlit.testing.v1 import AppTest
+
+    logging.disable(logging.WARNING)  # AppTest logs bare-mode warnings
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    form_ms = best_ms(lambda: at.run(), repeat=runs)
+
+    next(b for b in at.button if b.label == "Generate Quotation").click()
+    at.run()
+    if at.session_state["page"] != "quotation":
+        raise RuntimeError("form submit did not reach the quotation page")
+    quotation_ms = best_ms(lambda: at.run(), repeat=runs)
+    logging.disable(logging.NOTSET)
+    return {
+        "form_page_run": metric(form_ms, "ms"),
+        "quotation_page_run": metric(quotation_ms, "ms"),
+    }
+
+SUITE = [bench_workbook, bench_quotes, bench_pdf, bench_pages]
+
+def run_suite():
+    metrics = {}
+    for bench in SUITE:
+        metrics.update(bench())
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+
+# --- COMPARISON ---
+def compare(results, baseline, tolerance):
+    """Returns [(name, baseline value, current value, change)] for metrics that regressed."""
+    regressions = []
+    for name, current in results["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if not previous or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        worse = -change if current["better"] == "higher" else change
+        if worse > tolerance:
+            regressions.append((name, previous["value"], current["value"], change))
+    return regressions
+
+def print_results(results, baseline=None):
+    for name, m in results["metrics"].items():
+        line = f"  {name:<28} {m['value']:>12,.3f} {m['unit']:<6}"
+        if baseline and name in baseline["metrics"] and baseline["metrics"][name]["value"]:
+            line += f" ({m['value'] / baseline['metrics'][name]['value'] - 1:+.1%} vs baseline)"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="store results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (default: 0.25)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_suite()
+    print_results(results, baseline)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if not (args.output or args.save_baseline):
+        print(json.dumps(results))
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:,.3f} -> {after:,.3f} ({change:+.1%})", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,249 @@
+# ==========================================================
+# Platinum Life Bulk Quotation PDFs
+# Quotes a client file and renders one quotation per client across
+# a process pool, streaming the results into a ZIP (one PDF per
+# client) or a single merged multi-page PDF. Only a bounded number
+# of chunks is ever in flight and merged parts are copied straight
+# to the output file, so memory does not grow with the size of the
+# mail-out. Every generated PDF is recorded in the audit log.
+# Usage: python bulk_quotations.py clients.csv -o quotations.zip
+#        python bulk_quotations.py clients.csv -o quotations.pdf --workers 8 --chunksize 100
+# ==========================================================
+
+import os
+import re
+import sys
+import time
+import uuid
+import zipfile
+import argparse
+import multiprocessing
+from io import BytesIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import rating_engine
+import rate_registry
+import audit_log
+from batch_quote import iter_chunks, normalize_header, quote_frame
+from quotation_pdf import render_quotation_pdf, render_quotation_pages
+
+# --- RECORD MAPPING ---
+PREMIUM_FIELDS = {"base_premium": "base", "phcf_levy": "phcf", "stamp_duty": "stamp", "total_premium": "total"}
+CLIENT_FIELDS = ["client_name", "age", "gender", "smoker", "education", "sum_assured",
+                 "presenter_name", "distribution_channel", "presenter_code"]
+
+def records_from_file(path, chunksize=1000, table=None, skipped=None):
+    """Yields (row number, quote record) for every quotable row of a CSV/XLSX client file.
+
+    Rows flagged by the rating engine are not yielded; their row numbers are appended
+    to `skipped` when a list is given.
+    """
+    row_number = 0
+    for chunk in iter_chunks(path, chunksize):
+        quoted = quote_frame(chunk, table)
+        quoted.columns = [normalize_header(column) for column in quoted.columns]
+        for row in quoted.to_dict("records"):
+            row_number += 1
+            if row["error"]:
+                if skipped is not None:
+                    skipped.append(row_number)
+                continue
+            record = {field: row[field] for field in CLIENT_FIELDS if field in row}
+            record.update({key: row[column] for column, key in PREMIUM_FIELDS.items()})
+            record["age"] = int(record["age"])
+            for field in ("client_name", "presenter_name", "distribution_channel", "presenter_code"):
+                if field in record and not isinstance(record[field], str):
+                    record[field] = ""  # blank cells come through as NaN
+            yield row_number, record
+
+def pdf_file_name(number, quote):
+    """Deterministic archive name: zero-padded row number plus a filesystem-safe client name."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(quote.get("client_name", ""))).strip("_")
+    return f"{number:06d}_{slug or 'client'}.pdf"
+
+# --- PARALLEL RENDERING ---
+def _render_files(chunk):
+    return [(pdf_file_name(number, quote), render_quotation_pdf(quote).getvalue()) for number, quote in chunk]
+
+def _render_part(chunk):
+    return render_quotation_pages([quote for _, quote in chunk]).getvalue()
+
+def _chunked(records, chunksize):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _render_in_order(render, records, workers, chunksize):
+    """Yields (chunk, render(chunk)) in input order, keeping at most 2 * workers chunks in flight.
+
+    Workers are spawned rather than forked, so they never inherit a lock held by a parent thread.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        for chunk in _chunked(records, chunksize):
+            pending.append((chunk, pool.submit(render, chunk)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+def render_zip(records, output_path, workers=None, chunksize=50, progress=None, table=None):
+    """Renders (row number, quote) records into a ZIP with one PDF per client; returns the PDF count."""
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for chunk, files in _render_in_order(_render_files, records, workers, chunksize):
+            for (_, quote), (name, pdf_bytes) in zip(chunk, files):
+                archive.writestr(name, pdf_bytes)
+                audit_log.record_quote(quote, "pdf", pdf_bytes, table)
+            count += len(chunk)
+            if progress:
+                progress(count)
+    return count
+
+# --- MERGED OUTPUT ---
+class PdfConcatenator:
+    """Appends the pages of small PDFs to one open file as they arrive.
+
+    Each part's page objects (and everything they reference) are renumbered and written
+    straight to the file; only object offsets and page numbers stay in memory until
+    close() writes the page tree, catalog and cross-reference table. Needs pypdf.
+    """
+
+    CATALOG, PAGES = 1, 2
+
+    def __init__(self, f):
+        self._file = f
+        self._offsets = [None, None, None]  # by object number; 0 is the free-list head
+        self._kids = []
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def append(self, data):
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+        reader = PdfReader(BytesIO(data))
+        numbers = {}  # part object number -> output object number
+        pending = []
+
+        def renumber(value):
+            if isinstance(value, IndirectObject):
+                if value.idnum not in numbers:
+                    numbers[value.idnum] = len(self._offsets)
+                    self._offsets.append(None)
+                    pending.append(value)
+                return IndirectObject(numbers[value.idnum], 0, None)
+            if isinstance(value, DictionaryObject):
+                for key in list(value):
+                    value[key] = renumber(value.raw_get(key))  # indexing would resolve references
+            elif isinstance(value, ArrayObject):
+                value[:] = [renumber(item) for item in value]
+            return value
+
+        for page in reader.pages:
+            self._kids.append(renumber(page.indirect_reference).idnum)
+        while pending:
+            reference = pending.pop()
+            obj = reference.get_object()
+            is_page = isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page"
+            if is_page:
+                del obj["/Parent"]  # re-parented to the output page tree, not copied
+            obj = renumber(obj)
+            if is_page:
+                obj[NameObject("/Parent")] = IndirectObject(self.PAGES, 0, None)
+            self._write(numbers[reference.idnum], obj)
+
+    def _write(self, number, obj):
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(self._file)
+        self._file.write(b"\nendobj\n")
+
+    def close(self):
+        kids = " ".join(f"{number} 0 R" for number in self._kids)
+        self._write_raw(self.PAGES, f"<< /Type /Pages /Count {len(self._kids)} /Kids [{kids}] >>")
+        self._write_raw(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>")
+        xref = self._file.tell()
+        self._file.write(f"xref\n0 {len(self._offsets)}\n0000000000 65535 f \n".encode("ascii"))
+        self._file.write(b"".join(f"{offset:010d} 00000 n \n".encode("ascii") for offset in self._offsets[1:]))
+        self._file.write(f"trailer\n<< /Size {len(self._offsets)} /Root {self.CATALOG} 0 R >>\n"
+                         f"startxref\n{xref}\n%%EOF\n".encode("ascii"))
+
+    def _write_raw(self, number, text):
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n{text}\nendobj\n".encode("ascii"))
+
+def render_merged(records, output_path, workers=None, chunksize=50, progress=None, table=None):
+    """Renders (row number, quote) records into one multi-page PDF; returns the page count.
+
+    Each worker renders its chunk as a multi-page part; the parts are copied into the
+    output in order by PdfConcatenator, which needs pypdf. A quote's audit entry names
+    the document and its page; the document's own entry, written once the file is
+    complete, carries the hash of the delivered file.
+    """
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        raise ValueError("Merged PDF output requires pypdf; write a .zip instead") from None
+
+    workers = workers or os.cpu_count() or 1
+    document = f"{os.path.basename(output_path)}:{uuid.uuid4().hex[:12]}"
+    count = 0
+    with open(output_path, "wb") as f:
+        merged = PdfConcatenator(f)
+        for chunk, part in _render_in_order(_render_part, records, workers, chunksize):
+            merged.append(part)
+            for page, (_, quote) in enumerate(chunk, count + 1):
+                audit_log.record_quote(quote, "pdf", table=table, document=document, page=page)
+            count += len(chunk)
+            if progress:
+                progress(count)
+        merged.close()
+    audit_log.record_document(document, output_path, table)
+    return count
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a quotation PDF for every client in a CSV/XLSX file.")
+    parser.add_argument("input", help="CSV or XLSX client file (client_name, age, gender, smoker, education, sum_assured)")
+    parser.add_argument("-o", "--output", required=True, help=".zip for one PDF per client, .pdf for a merged document")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="rendering processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=50, help="quotations per worker task (default: 50)")
+    parser.add_argument("--rates", help="rates workbook to quote against (default: the registry version in force)")
+    args = parser.parse_args(argv)
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension not in (".zip", ".pdf"):
+        parser.error("output must be a .zip or .pdf file")
+    if args.workers < 1 or args.chunksize < 1:
+        parser.error("--workers and --chunksize must be positive")
+
+    start = time.perf_counter()
+
+    def progress(count):
+        print(f"  {count:>10,} PDFs  {count / (time.perf_counter() - start):>8,.1f} PDFs/s", file=sys.stderr)
+
+    table = rating_engine.load_rate_table(args.rates) if args.rates else rate_registry.current_table(watch=False)
+    skipped = []
+    render = render_zip if extension == ".zip" else render_merged
+    try:
+        records = records_from_file(args.input, table=table, skipped=skipped)
+        count = render(records, args.output, args.workers, args.chunksize, progress, table)
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - start
+
+    print(f"Rendered {count:,} quotations ({len(skipped):,} rows skipped) in {elapsed:.2f}s "
+          f"({count / elapsed:,.1f} PDFs/s) -> {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
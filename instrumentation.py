@@ -0,0 +1,218 @@
+# ==========================================================
+# Platinum Life Timing Instrumentation
+# Opt-in timing spans around each phase of a request (workbook
+# load, logo encoding, premium calculation, PDF rendering, whole
+# Streamlit runs), aggregated in-process into counters and latency
+# histograms keyed by phase and page, plus per-session totals.
+# Export as Prometheus text or periodic JSON log lines, together
+# with the quote caches' hit/miss counters (always on).
+#
+# Enable with PREMIUM_RATER_METRICS=1; PREMIUM_RATER_METRICS_INTERVAL
+# sets the JSON log period in seconds (default 60). When disabled,
+# span() returns a shared no-op object.
+# ==========================================================
+
+import os
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+
+ENABLED = os.environ.get("PREMIUM_RATER_METRICS", "").lower() not in ("", "0", "false", "no")
+LOG_INTERVAL = float(os.environ.get("PREMIUM_RATER_METRICS_INTERVAL", "60"))
+
+# Histogram upper bounds in seconds (Prometheus convention); +Inf is implicit.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_SESSIONS = 1000
+
+logger = logging.getLogger("premium_rater.metrics")
+
+
+class Histogram:
+    """Cumulative-on-export latency histogram with count and sum."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+_lock = threading.Lock()
+_histograms = {}  # (phase, page) -> Histogram
+_sessions = OrderedDict()  # session -> {(phase, page): [spans, seconds]}
+
+
+def record(phase, seconds, page="", session=""):
+    with _lock:
+        histogram = _histograms.get((phase, page))
+        if histogram is None:
+            histogram = _histograms[(phase, page)] = Histogram()
+        histogram.observe(seconds)
+        if session:
+            phases = _sessions.pop(session, None) or {}
+            _sessions[session] = phases  # most recently active last
+            totals = phases.setdefault((phase, page), [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            if len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+
+# --- SPANS ---
+class Span:
+    __slots__ = ("phase", "page", "session", "start")
+
+    def __init__(self, phase, page, session):
+        self.phase = phase
+        self.page = page
+        self.session = session
+        self.start = time.perf_counter()
+
+    def stop(self):
+        """Records the span once; later calls are ignored."""
+        if self.start is not None:
+            record(self.phase, time.perf_counter() - self.start, self.page, self.session)
+            self.start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+def span(phase, page="", session=""):
+    """Times a phase: `with span("generate_pdf", page="quotation"): ...` or `s = span(...); s.stop()`."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(phase, page, session)
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _sessions.clear()
+
+# --- EXPORT ---
+def snapshot():
+    """Plain-dict copy of the aggregates, suitable for JSON."""
+    with _lock:
+        phases = [
+            {"phase": phase, "page": page, "count": h.count, "sum_seconds": h.sum,
+             "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], h.counts))}
+            for (phase, page), h in _histograms.items()
+        ]
+        sessions = {session: [{"phase": phase, "page": page, "spans": n, "seconds": s}
+                              for (phase, page), (n, s) in phases.items()]
+                    for session, phases in _sessions.items()}
+    return {"time": time.time(), "phases": phases, "sessions": sessions, "caches": _cache_stats()}
+
+def _cache_stats():
+    import quote_cache  # imported late: quote_cache pulls in the rating engine
+
+    return quote_cache.cache_stats()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+CACHE_METRICS = [
+    ("hits_total", "counter", "Quote cache lookups served from the cache."),
+    ("misses_total", "counter", "Quote cache lookups that had to compute."),
+    ("evictions_total", "counter", "Quote cache entries evicted to stay within bounds."),
+    ("entries", "gauge", "Quote cache entries held."),
+    ("bytes", "gauge", "Quote cache bytes held (PDF cache only)."),
+]
+
+def prometheus_text():
+    """Prometheus text exposition format (version 0.0.4) of the current aggregates."""
+    with _lock:
+        histograms = [(key, list(h.counts), h.count, h.sum) for key, h in _histograms.items()]
+        sessions = [(session, phase, page, n, s)
+                    for session, phases in _sessions.items() for (phase, page), (n, s) in phases.items()]
+
+    lines = [
+        "# HELP premium_rater_phase_duration_seconds Time spent per request phase.",
+        "# TYPE premium_rater_phase_duration_seconds histogram",
+    ]
+    for (phase, page), counts, count, total in sorted(histograms):
+        cumulative = 0
+        for bound, n in zip([*map(str, BUCKETS), "+Inf"], counts):
+            cumulative += n
+            lines.append(f"premium_rater_phase_duration_seconds_bucket{{{_labels(phase=phase, page=page, le=bound)}}} {cumulative}")
+        lines.append(f"premium_rater_phase_duration_seconds_sum{{{_labels(phase=phase, page=page)}}} {total}")
+        lines.append(f"premium_rater_phase_duration_seconds_count{{{_labels(phase=phase, page=page)}}} {count}")
+
+    lines += [
+        "# HELP premium_rater_session_spans_total Timed spans per session, phase and page.",
+        "# TYPE premium_rater_session_spans_total counter",
+    ]
+    lines += [f"premium_rater_session_spans_total{{{_labels(session=s, phase=ph, page=p)}}} {n}"
+              for s, ph, p, n, _ in sessions]
+    lines += [
+        "# HELP premium_rater_session_seconds_total Timed seconds per session, phase and page.",
+        "# TYPE premium_rater_session_seconds_total counter",
+    ]
+    lines += [f"premium_rater_session_seconds_total{{{_labels(session=s, phase=ph, page=p)}}} {t}"
+              for s, ph, p, _, t in sessions]
+
+    caches = _cache_stats()
+    for name, kind, help_text in CACHE_METRICS:
+        lines += [f"# HELP premium_rater_cache_{name} {help_text}", f"# TYPE premium_rater_cache_{name} {kind}"]
+        field = name.removesuffix("_total")
+        lines += [f"premium_rater_cache_{name}{{{_labels(cache=cache)}}} {stats[field]}"
+                  for cache, stats in caches.items()]
+    return "\n".join(lines) + "\n"
+
+_log_thread = None
+_log_thread_lock = threading.Lock()
+
+def start_json_logger(interval=LOG_INTERVAL):
+    """Logs a JSON snapshot line every `interval` seconds from a daemon thread; idempotent."""
+    global _log_thread
+    with _log_thread_lock:
+        if _log_thread is not None or not ENABLED:
+            return
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+        def run():
+            while True:
+                time.sleep(interval)
+                logger.info(json.dumps(snapshot()))
+
+        _log_thread = threading.Thread(target=run, name="metrics-json-logger", daemon=True)
+        _log_thread.start()
@@ -0,0 +1,83 @@
+# ==========================================================
+# Platinum Life PDF Render Pool
+# Quotation PDFs are rendered off the request path on one shared,
+# bounded thread pool per server process. Threads (not processes)
+# keep the encoded logo and the rendered-PDF cache shared across
+# sessions. At most PDF_WORKERS renders run at once and at most
+# PDF_QUEUE_DEPTH more wait; further submissions are refused instead
+# of queueing without limit, and the caller retries later. Every
+# finished render is written to the audit log.
+#
+# PREMIUM_RATER_PDF_WORKERS (default: min(4, CPUs)) and
+# PREMIUM_RATER_PDF_QUEUE (default 32) override the limits.
+# ==========================================================
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import audit_log
+import instrumentation
+from quote_cache import cached_quotation_pdf
+
+# --- POOL LIMITS ---
+PDF_WORKERS = int(os.environ.get("PREMIUM_RATER_PDF_WORKERS") or min(4, os.cpu_count() or 1))
+PDF_QUEUE_DEPTH = int(os.environ.get("PREMIUM_RATER_PDF_QUEUE") or 32)
+
+
+class RenderPool:
+    """Fixed-size render executor with a bounded queue; submit() returns None when it is full."""
+
+    def __init__(self, workers=PDF_WORKERS, queue_depth=PDF_QUEUE_DEPTH):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, quote, page="", session=""):
+        """Starts rendering `quote`; returns a Future of the PDF bytes, or None if the pool is saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        try:
+            future = self._executor.submit(_render, quote, page, session)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+            }
+
+
+def _render(quote, page, session):
+    with instrumentation.span("generate_pdf", page, session):
+        pdf = cached_quotation_pdf(quote)
+    audit_log.record_quote(quote, "pdf", pdf)
+    return pdf
+
+pool = RenderPool()
+
+def submit(quote, page="", session=""):
+    return pool.submit(quote, page, session)
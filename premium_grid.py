@@ -0,0 +1,247 @@
+# ==========================================================
+# Platinum Life Premium Grid
+# The form only accepts ages 18-55 and sums assured 1M-35M in 500k
+# steps across 8 risk classes (~21k quotes), so the whole domain is
+# precomputed once per rate-table version. Any on-grid quote is then
+# a single array read. The grid is also exported next to the
+# workbook as an offline rate sheet (CSV + packed binary); servers
+# re-export it in the background whenever the workbook changes.
+# compare() prices a client's what-if table (all 8 risk classes
+# across nearby ages and a ladder of sums assured) in one broadcast.
+# Usage: python premium_grid.py [-o output_dir]
+# ==========================================================
+
+import os
+import re
+import sys
+import struct
+import contextlib
+import argparse
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import rating_engine
+from rating_engine import (
+    EDUCATION_LEVELS, GENDERS, SMOKER_STATUSES, MAX_ENTRY_AGE, MAX_SUM_ASSURED, MIN_ENTRY_AGE,
+    MIN_SUM_ASSURED, PHCF_RATE, STAMP_DUTY, SUM_ASSURED_STEP, EDUCATION_CODES, GENDER_CODES, SMOKER_CODES,
+)
+
+# --- GRID DOMAIN ---
+AGES = np.arange(MIN_ENTRY_AGE, MAX_ENTRY_AGE + 1)
+SUMS_ASSURED = np.arange(MIN_SUM_ASSURED, MAX_SUM_ASSURED + 1, SUM_ASSURED_STEP, dtype=np.float64)
+COMPONENTS = ["base", "phcf", "stamp", "total"]
+
+
+class PremiumGrid:
+    """Premium components for every on-grid quote, shape (age, gender, smoker, education, sum assured, component)."""
+
+    def __init__(self, base, checksum=None, source=None):
+        phcf = PHCF_RATE * base
+        stamp = np.full_like(base, STAMP_DUTY)
+        self.values = np.stack([base, phcf, stamp, base + phcf + stamp], axis=-1)
+        self.values.flags.writeable = False
+        self.checksum = checksum
+        self.source = source
+
+    @property
+    def base(self):
+        return self.values[..., 0]
+
+    def lookup(self, age, gender, smoker, education, sum_assured):
+        """Returns (base, phcf, stamp, total), or None when the quote is off the grid."""
+        age_index = int(age) - MIN_ENTRY_AGE
+        sum_index, remainder = divmod(sum_assured - MIN_SUM_ASSURED, SUM_ASSURED_STEP)
+        if remainder or not (0 <= age_index < len(AGES) and 0 <= sum_index < len(SUMS_ASSURED)):
+            return None
+        try:
+            codes = GENDER_CODES[gender], SMOKER_CODES[smoker], EDUCATION_CODES[education]
+        except KeyError:
+            return None
+        base, phcf, stamp, total = self.values[(age_index, *codes, int(sum_index))].tolist()
+        return base, phcf, stamp, total
+
+
+def build_grid(table):
+    """Computes the grid from a RateTable with one broadcast, using calculate_premium's formula."""
+    if table.min_age > MIN_ENTRY_AGE or table.max_age < MAX_ENTRY_AGE:
+        raise ValueError(f"Rate table does not cover ages {MIN_ENTRY_AGE}-{MAX_ENTRY_AGE}")
+    rates = np.asarray(table.rates[AGES - table.min_age])
+    base = (rates / 1000)[..., np.newaxis] * SUMS_ASSURED
+    return PremiumGrid(base, table.checksum, table.source)
+
+_grids = {}
+_grids_lock = threading.Lock()
+
+def grid_for(table, export=False):
+    """Returns the process-wide grid for `table`, building it once per rate-table version.
+
+    With `export`, the first build for a version also refreshes the offline exports in a
+    background thread; only long-running servers ask for that, since a one-shot CLI would
+    exit mid-write.
+    """
+    key = (table.checksum, table.version)
+    grid = _grids.get(key)
+    if grid is None:
+        with _grids_lock:
+            grid = _grids.get(key)
+            if grid is None:
+                grid = build_grid(table)
+                _grids.clear()  # only the current version is kept
+                _grids[key] = grid
+                if export:
+                    threading.Thread(target=_refresh_exports, args=(grid,), daemon=True).start()
+    return grid
+
+# --- COMPARISON ---
+# Risk classes in rate-column order (gender -> smoker -> education).
+RISK_CLASSES = [(g, s, e) for g in GENDERS for s in SMOKER_STATUSES for e in EDUCATION_LEVELS]
+COMPARISON_AGE_SPAN = 5
+COMPARISON_SUMS = (1_000_000, 2_000_000, 3_000_000, 5_000_000, 7_500_000, 10_000_000,
+                   15_000_000, 20_000_000, 25_000_000, 30_000_000, 35_000_000)
+
+
+class Comparison(namedtuple("Comparison", "age sum_assured ages sums_assured by_age by_sum")):
+    """Total monthly premiums per RISK_CLASSES column.
+
+    by_age[i] is ages[i] at the client's sum assured; by_sum[j] is sums_assured[j] at the client's age.
+    Plain tuples throughout, so a Comparison can be part of a PDF cache key.
+    """
+
+    __slots__ = ()
+
+
+def premium_totals(table, ages, sums_assured):
+    """Total premiums of shape (age, risk class, sum assured), using calculate_premium's formula."""
+    rates = np.asarray(table.rates[np.asarray(ages) - table.min_age]).reshape(len(ages), len(RISK_CLASSES))
+    base = (rates / 1000)[..., np.newaxis] * np.asarray(sums_assured, dtype=np.float64)
+    return base + PHCF_RATE * base + STAMP_DUTY
+
+def compare(table, age, sum_assured, age_span=COMPARISON_AGE_SPAN, sums_assured=COMPARISON_SUMS):
+    """What-if premiums for a client: ages within `age_span` and the sums-assured ladder, all risk classes."""
+    age, sum_assured = int(age), float(sum_assured)
+    ages = list(range(max(MIN_ENTRY_AGE, age - age_span), min(MAX_ENTRY_AGE, age + age_span) + 1))
+    if age not in ages:
+        ages = sorted([*ages, age])
+    sums = sorted({*map(float, sums_assured), sum_assured})
+    totals = premium_totals(table, ages, sums)
+    by_age = totals[:, :, sums.index(sum_assured)]
+    by_sum = totals[ages.index(age)].T
+    return Comparison(age, sum_assured, tuple(ages), tuple(sums),
+                      tuple(map(tuple, by_age.tolist())), tuple(map(tuple, by_sum.tolist())))
+
+# --- OFFLINE EXPORT ---
+# Packed binary layout: 96-byte header (magic, format version, SHA-256
+# of the source workbook, first age, number of ages, first sum
+# assured, sum assured step, number of sums assured) followed by the
+# little-endian float64 base premiums in C order with shape
+# (age, gender, smoker, education, sum assured). PHCF is 0.25% of
+# base and stamp duty is KShs 40, so the other components are derived.
+GRID_MAGIC = b"PLGRID\0\0"
+GRID_FORMAT = 1
+GRID_HEADER = struct.Struct("<8sI32siiqqi")
+GRID_HEADER_SIZE = 96
+
+def export_paths(directory=None, workbook=rating_engine.DATA_PATH):
+    stem = os.path.splitext(os.path.basename(workbook))[0]
+    directory = directory or os.path.dirname(workbook)
+    return os.path.join(directory, f"{stem}.grid.csv"), os.path.join(directory, f"{stem}.grid.bin")
+
+def write_binary(grid, path):
+    header = GRID_HEADER.pack(GRID_MAGIC, GRID_FORMAT, grid.checksum or b"", MIN_ENTRY_AGE, len(AGES),
+                              MIN_SUM_ASSURED, SUM_ASSURED_STEP, len(SUMS_ASSURED))
+    _write_atomic(path, header.ljust(GRID_HEADER_SIZE, b"\0") + np.ascontiguousarray(grid.base, dtype="<f8").tobytes())
+
+def read_binary(path):
+    """Loads a packed grid export back into a PremiumGrid."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, file_format, checksum, _, n_ages, _, _, n_sums = GRID_HEADER.unpack_from(data)
+    if magic != GRID_MAGIC or file_format != GRID_FORMAT:
+        raise ValueError(f"{path} is not a premium grid export")
+    shape = (n_ages, len(GENDERS), len(SMOKER_STATUSES), len(EDUCATION_LEVELS), n_sums)
+    base = np.frombuffer(data, dtype="<f8", offset=GRID_HEADER_SIZE, count=int(np.prod(shape))).reshape(shape)
+    return PremiumGrid(base.astype(np.float64), checksum)
+
+def binary_checksum(path):
+    try:
+        with open(path, "rb") as f:
+            return GRID_HEADER.unpack(f.read(GRID_HEADER.size))[2]
+    except (OSError, struct.error):
+        return None
+
+def _remove_stale_tmp(path):
+    """Deletes temp files left by exports whose process died mid-write."""
+    directory, name = os.path.split(path)
+    for entry in os.scandir(directory or "."):
+        match = re.fullmatch(re.escape(name) + r"\.(\d+)\.tmp", entry.name)
+        if match and not _pid_alive(int(match[1])):
+            with contextlib.suppress(OSError):
+                os.remove(entry.path)
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+def write_csv(grid, path):
+    """Long-format rate sheet: one row per age, risk class and sum assured."""
+    import pandas as pd
+
+    index = pd.MultiIndex.from_product([AGES, GENDERS, SMOKER_STATUSES, EDUCATION_LEVELS, SUMS_ASSURED.astype(np.int64)],
+                                       names=["age", "gender", "smoker", "education", "sum_assured"])
+    frame = pd.DataFrame(grid.values.reshape(-1, len(COMPONENTS)), index=index, columns=COMPONENTS).reset_index()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        frame.to_csv(tmp_path, index=False, float_format="%.2f")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def export_grid(grid, directory=None, force=False):
+    """Writes the CSV and packed binary exports unless they already match the grid's workbook."""
+    csv_path, bin_path = export_paths(directory, grid.source or rating_engine.DATA_PATH)
+    for path in (csv_path, bin_path):
+        _remove_stale_tmp(path)
+    if not force and grid.checksum and binary_checksum(bin_path) == grid.checksum and os.path.exists(csv_path):
+        return csv_path, bin_path
+    write_csv(grid, csv_path)
+    write_binary(grid, bin_path)  # written last: its checksum marks the pair as current
+    return csv_path, bin_path
+
+def _refresh_exports(grid):
+    try:
+        export_grid(grid)
+    except OSError:
+        pass  # read-only deployment: the in-memory grid still serves lookups
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the full premium grid as an offline rate sheet.")
+    parser.add_argument("-o", "--output-dir", help="directory for the .grid.csv/.grid.bin files (default: next to the workbook)")
+    args = parser.parse_args(argv)
+    grid = grid_for(rating_engine.load_rate_table(), export=False)
+    for path in export_grid(grid, args.output_dir, force=True):
+        print(f"{path} ({os.path.getsize(path):,} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,42 +4,49 @@
 # ==========================================================
 
 import streamlit as st
-import pandas as pd
-from PIL import Image
-import os
-from io import BytesIO
-from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.lib import colors
 import base64
 
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import rating_engine
+import rate_registry
+import premium_grid
+import instrumentation
+import audit_log
+import pdf_jobs
+from quote_cache import cached_premium, pdf_key
+
 # --- APP CONFIG ---
 st.set_page_config(page_title="Platinum Life Premium Autorater", layout="wide")
 
-# --- FILE PATHS ---
-base_path = os.path.dirname(__file__)
-data_path = os.path.join(base_path, "Per Mille rates data_v1.xlsx")
-logo_path = os.path.join(base_path, "Company logo.png")
+# --- INSTRUMENTATION ---
+# Spans are no-ops unless PREMIUM_RATER_METRICS is set; see instrumentation.py.
+instrumentation.start_json_logger()
+script_ctx = get_script_run_ctx()
+session_id = script_ctx.session_id if script_ctx else ""
+current_page = st.session_state.get("page", "form")
+script_span = instrumentation.span("script_run", current_page, session_id)
 
 # --- LOAD DATA ---
 try:
-    df = pd.read_excel(data_path)
+    with instrumentation.span("rate_table_load", current_page, session_id):
+        rate_table = rate_registry.current_table()
 except FileNotFoundError:
-    st.error("❌ Could not find 'Per Mille rates data_v1.xlsx'. Please ensure it's in the same folder as this script.")
+    st.error("❌ Could not find a rates workbook ('Per Mille rates data_v1.xlsx'). Please ensure it's in the same folder as this script.")
     st.stop()
 
 # --- LOAD LOGO ---
+@st.cache_resource(show_spinner=False)
 def load_logo_base64(path):
+    """Reads and base64-encodes the logo once per server process."""
     try:
-        with open(path, "rb") as img_file:
+        with instrumentation.span("logo_encoding"), open(path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode()
     except FileNotFoundError:
         st.warning("⚠️ Company logo not found. Please ensure 'Company logo.png' is in the same folder.")
         return None
 
-logo_base64 = load_logo_base64(logo_path)
+logo_base64 = load_logo_base64(rating_engine.LOGO_PATH)
 
 # --- PAGE STYLE ---
 st.markdown("""
@@ -51,9 +58,12 @@ st.markdown("""
     .header-logo {width: 25vw; max-width: 180px; height: auto; margin-bottom: 1vh;}
     .section-header {color: #003366; font-weight: 800; font-size: 20px; text-align: center; margin-bottom: 20px;}
     label, .stTextInput label, .stSelectbox label, .stNumberInput label {color: #003366 !important; font-weight: 600 !important;}
-    div.stButton > button:first-child {background-color: #003366; color: white; font-weight: bold; border: none; border-radius: 8px; padding: 12px 0; transition: all 0.3s ease;}
-    div.stButton > button:first-child:hover {transform: scale(1.03); background-color: #00224f;}
+    div.stButton > button:first-child, div.stFormSubmitButton > button:first-child {background-color: #003366; color: white; font-weight: bold; border: none; border-radius: 8px; padding: 12px 0; transition: all 0.3s ease;}
+    div.stButton > button:first-child:hover, div.stFormSubmitButton > button:first-child:hover {transform: scale(1.03); background-color: #00224f;}
     .gold-line {border-top: 2px solid #d4af37; margin: 10px 0;}
+    .info-box {background-color: #f9f9f9; padding: 12px 16px; border-radius: 10px; border: 1px solid #e0e0e0; box-shadow: 0px 1px 3px rgba(0,0,0,0.1); margin-bottom: 10px;}
+    .info-label {color: #004080; font-weight: 600; font-size: 15px; margin-bottom: 2px;}
+    .info-value {font-size: 14px; color: #333333; margin-top: 0;}
 </style>
 """, unsafe_allow_html=True)
 
@@ -62,167 +72,85 @@ if "page" not in st.session_state:
     st.session_state.page = "form"
 
 # --- PREMIUM CALCULATION FUNCTION ---
+QUOTE_KEYS = ["client_name", "age", "gender", "smoker", "education", "sum_assured", "base", "phcf", "stamp", "total",
+              "rate_table_version"]
+
 def calculate_premium(age, gender, smoker, education, sum_assured):
-    rate_row = df[df['Age'] == age]
-    if rate_row.empty:
+    try:
+        with instrumentation.span("calculate_premium", current_page, session_id):
+            return cached_premium(age, gender, smoker, education, sum_assured, rate_table)
+    except ValueError:
         st.error("⚠️ No matching rate found for this age.")
         return 0, 0, 0, 0
 
-    if gender == "Male" and smoker == "Smoker" and education == "Tertiary":
-        rate = rate_row["Male Smoker Tertiary"].values[0]
-    elif gender == "Male" and smoker == "Smoker" and education == "Non Tertiary":
-        rate = rate_row["Male Smoker Non Tertiary"].values[0]
-    elif gender == "Male" and smoker == "Non Smoker" and education == "Tertiary":
-        rate = rate_row["Male Non Smoker Tertiary"].values[0]
-    elif gender == "Male" and smoker == "Non Smoker" and education == "Non Tertiary":
-        rate = rate_row["Male Non Smoker Non Tertiary"].values[0]
-    elif gender == "Female" and smoker == "Smoker" and education == "Tertiary":
-        rate = rate_row["Female Smoker Tertiary"].values[0]
-    elif gender == "Female" and smoker == "Smoker" and education == "Non Tertiary":
-        rate = rate_row["Female Smoker Non Tertiary"].values[0]
-    elif gender == "Female" and smoker == "Non Smoker" and education == "Tertiary":
-        rate = rate_row["Female Non Smoker Tertiary"].values[0]
-    else:
-        rate = rate_row["Female Non Smoker Non Tertiary"].values[0]
-
-    base = (rate / 1000) * sum_assured
-    phcf = 0.0025 * base
-    stamp = 40
-    total = base + phcf + stamp
-    return base, phcf, stamp, total
-
-# --- PDF GENERATION FUNCTION ---
-def generate_pdf():
-    """Generates a simple PDF quotation using ReportLab based on session data."""
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # --- Header Logo (Top Right) ---
-    logo_path_local = os.path.join(base_path, "Company logo.png")
-    if os.path.exists(logo_path_local):
-        logo_width = 100
-        logo_height = 60
-        c.drawImage(logo_path_local, width - logo_width - 50, height - logo_height - 40,
-                    width=logo_width, height=logo_height, preserveAspectRatio=True, mask='auto')
-
-    # --- Header Title ---
-    c.setFillColorRGB(0, 0, 0.6)  # Dark Blue
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(50, height - 80, "PLATINUM LIFE QUOTATION")
-
-    # --- Draw Line ---
-    c.setStrokeColorRGB(0, 0, 0.6)
-    c.setLineWidth(1)
-    c.line(50, height - 90, width - 50, height - 90)
-
-    # --- Retrieve Values ---
-    client_name = st.session_state.get("client_name", "")
-    age = st.session_state.get("age", 0)
-    gender = st.session_state.get("gender", "")
-    smoker = st.session_state.get("smoker", "")
-    education = st.session_state.get("education", "")
-    sum_assured = st.session_state.get("sum_assured", 0)
-    base = st.session_state.get("base", 0.0)
-    phcf = st.session_state.get("phcf", 0.0)
-    stamp = st.session_state.get("stamp", 40.0)
-    total = st.session_state.get("total", 0.0)
-    presenter_name = st.session_state.get("presenter_name_display", "")
-    distribution_channel = st.session_state.get("distribution_channel_display", "")
-    presenter_code = st.session_state.get("presenter_code_display", "")
-
-    # --- Client Details ---
-    y = height - 140
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Client Details:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica", 12)
-    c.drawString(70, y, f"Client Name: {client_name}")
-    y -= 15
-    c.drawString(70, y, f"Age: {age}")
-    y -= 15
-    c.drawString(70, y, f"Gender: {gender}")
-    y -= 15
-    c.drawString(70, y, f"Smoker: {smoker}")
-    y -= 15
-    c.drawString(70, y, f"Education Level: {education}")
-    y -= 15
-    c.drawString(70, y, f"Sum Assured: KShs {sum_assured:,.2f}")
-
-    # --- Premium Breakdown ---
-    y -= 40
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Premium Breakdown:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica", 12)
-    c.drawString(70, y, f"Base Premium: KShs {base:,.2f}")
-    y -= 15
-    c.drawString(70, y, f"PHCF Levy: KShs {phcf:,.2f}")
-    y -= 15
-    c.drawString(70, y, f"Stamp Duty: KShs {stamp:,.2f}")
-
-    # --- Total Monthly Premium ---
-    y -= 30
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Total Monthly Premium:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica-Bold", 13)
-    c.drawString(70, y, f"KShs {total:,.2f}")
-
-    # --- Presenter Details ---
-    y -= 50
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Presenter Details:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica", 12)
-    c.drawString(70, y, f"Presenter Name: {presenter_name}")
-    y -= 15
-    c.drawString(70, y, f"Distribution Channel: {distribution_channel}")
-    y -= 15
-    c.drawString(70, y, f"Presenter Code: {presenter_code}")
-
-    # --- Tax Relief Section ---
-    y -= 40
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, "Tax Relief:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica", 12)
-    c.drawString(70, y, "Enjoy up to Kshs 60,000 per year in tax relief.")
-
-    # --- Disclaimer Section ---
-    y -= 60
-    c.setFillColorRGB(0, 0, 0.6)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, "Disclaimer:")
-    y -= 20
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica", 10)
-    text = (
-        "Liberty Life has taken all reasonable steps towards ensuring that the information represented herein is true, "
-        "current and accurate. The illustrative values represented here are based on stated assumptions and are indicative "
-        "rates only. The figures may vary dependent on factors such as the age and gender of client. Accordingly, Liberty "
-        "Life cannot be held liable for any damages arising from any transactions or omissions and the resultant actions "
-        "arising from the information contained in the illustrative values."
+def session_quote():
+    """The current quote and presenter details as a plain record."""
+    quote = {key: st.session_state[key] for key in QUOTE_KEYS if key in st.session_state}
+    quote["presenter_name"] = st.session_state.get("presenter_name_display", "")
+    quote["distribution_channel"] = st.session_state.get("distribution_channel_display", "")
+    quote["presenter_code"] = st.session_state.get("presenter_code_display", "")
+    return quote
+
+# --- COMPARISON FUNCTIONS ---
+COMPARISON_COLUMNS = [f"{g} / {s} / {e}" for g, s, e in premium_grid.RISK_CLASSES]
+HEATMAP_STYLES = [f"background-color: rgb({255 - 2 * i}, {255 - i}, 255)" for i in range(101)]  # white -> light blue
+
+def session_comparison():
+    """What-if premiums for the quoted client across all risk classes, nearby ages and sums assured."""
+    return premium_grid.compare(rate_table, st.session_state["age"], st.session_state["sum_assured"])
+
+def heatmap(rows, index):
+    """Styled table of totals, shaded by value in one array operation."""
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame(rows, index=index, columns=COMPARISON_COLUMNS)
+    values = frame.to_numpy()
+    low, high = np.nanmin(values), np.nanmax(values)
+    shade = np.nan_to_num(np.rint(100 * (values - low) / max(high - low, 1e-9))).astype(int)
+    styles = pd.DataFrame(np.asarray(HEATMAP_STYLES)[shade], index=frame.index, columns=frame.columns)
+    return frame.style.apply(lambda _: styles, axis=None).format("{:,.2f}")
+
+# --- PDF GENERATION FUNCTIONS ---
+PDF_POLL_SECONDS = 0.25
+
+def start_pdf_render():
+    """Submits this session's quotation PDF to the shared render pool once per quote.
+
+    The (quote key, future) pair stays in session state, so reruns reuse the rendered bytes.
+    """
+    quote = session_quote()
+    if st.session_state.get("pdf_comparison"):
+        quote["comparison"] = session_comparison()
+    key = pdf_key(quote)
+    job = st.session_state.get("pdf_job")
+    if job is None or job[0] != key or job[1] is None:  # new quote, or the pool was full last time
+        job = st.session_state["pdf_job"] = (key, pdf_jobs.submit(quote, current_page, session_id))
+    return job[1]
+
+def pdf_download_button(future):
+    """Single-click download of the rendered PDF; disabled while the render is still pending."""
+    ready = future is not None and future.done()
+    if ready and future.exception() is not None:
+        st.error("⚠️ Could not generate the quotation PDF.")
+        return
+    st.download_button(
+        label="⬇️ Download Quotation (PDF)" if ready else "⏳ Preparing Quotation PDF...",
+        data=future.result() if ready else b"",
+        file_name="Platinum_Life_Quotation.pdf",
+        mime="application/pdf",
+        on_click="ignore",
+        disabled=not ready,
+        use_container_width=True
     )
-    text_obj = c.beginText(70, y - 15)
-    text_obj.textLines(text)
-    c.drawText(text_obj)
 
-    # --- Save PDF ---
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
+@st.fragment(run_every=PDF_POLL_SECONDS)
+def pending_pdf_download():
+    """Polls the pending render without rerunning the page; reruns the page once it is done."""
+    future = start_pdf_render()
+    if future is not None and future.done():
+        st.rerun()
+    pdf_download_button(future)
 
 # --- PAGE 1: CLIENT FORM ---
 if st.session_state.page == "form":
@@ -244,33 +172,36 @@ if st.session_state.page == "form":
         unsafe_allow_html=True
     )
 
-    col1, col2 = st.columns([2, 1], gap="large")
-
-    # --- LEFT COLUMN: CLIENT DETAILS ---
-    with col1:
-        client_name = st.text_input("Client Name", placeholder="Enter client's full name")
-        age = st.number_input("Age (Last Birthday)", min_value=18, max_value=55, step=1, value=30)
-        gender = st.selectbox("Gender", ["Male", "Female"])
-        smoker = st.selectbox("Smoker Status", ["Smoker", "Non Smoker"])
-        education = st.selectbox("Education Level", ["Tertiary", "Non Tertiary"])
-        sum_assured = st.number_input(
-            "Sum Assured (1,000,000 – 35,000,000)",
-            min_value=1_000_000,
-            max_value=35_000_000,
-            step=500_000,
-            value=1_000_000
-        )
+    # Widgets inside the form only send their values when it is submitted,
+    # so typing client details does not rerun the script.
+    with st.form("client_form", border=False):
+        col1, col2 = st.columns([2, 1], gap="large")
 
-    # --- RIGHT COLUMN: PRESENTER DETAILS ---
-    with col2:
-        st.markdown("<div style='margin-top:60px;'>", unsafe_allow_html=True)
-        presenter_name_display = st.text_input("Presenter Name", key="presenter_name_display")
-        distribution_channel_display = st.text_input("Distribution Channel", key="distribution_channel_display")
-        presenter_code_display = st.text_input("Presenter Code", key="presenter_code_display")
+        # --- LEFT COLUMN: CLIENT DETAILS ---
+        with col1:
+            client_name = st.text_input("Client Name", placeholder="Enter client's full name")
+            age = st.number_input("Age (Last Birthday)", min_value=rating_engine.MIN_ENTRY_AGE, max_value=rating_engine.MAX_ENTRY_AGE, step=1, value=30)
+            gender = st.selectbox("Gender", ["Male", "Female"])
+            smoker = st.selectbox("Smoker Status", ["Smoker", "Non Smoker"])
+            education = st.selectbox("Education Level", ["Tertiary", "Non Tertiary"])
+            sum_assured = st.number_input(
+                "Sum Assured (1,000,000 – 35,000,000)",
+                min_value=rating_engine.MIN_SUM_ASSURED,
+                max_value=rating_engine.MAX_SUM_ASSURED,
+                step=rating_engine.SUM_ASSURED_STEP,
+                value=rating_engine.MIN_SUM_ASSURED
+            )
 
-        st.markdown("<div style='margin-top:40px; text-align:center;'>", unsafe_allow_html=True)
-        calculate_btn = st.button("Generate Quotation", use_container_width=True)
-        st.markdown("</div></div>", unsafe_allow_html=True)
+        # --- RIGHT COLUMN: PRESENTER DETAILS ---
+        with col2:
+            st.markdown("<div style='margin-top:60px;'>", unsafe_allow_html=True)
+            presenter_name_display = st.text_input("Presenter Name", key="presenter_name_display")
+            distribution_channel_display = st.text_input("Distribution Channel", key="distribution_channel_display")
+            presenter_code_display = st.text_input("Presenter Code", key="presenter_code_display")
+
+            st.markdown("<div style='margin-top:40px; text-align:center;'>", unsafe_allow_html=True)
+            calculate_btn = st.form_submit_button("Generate Quotation", use_container_width=True)
+            st.markdown("</div></div>", unsafe_allow_html=True)
 
     st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -290,13 +221,23 @@ if st.session_state.page == "form":
             "phcf": phcf,
             "stamp": stamp,
             "total": total,
+            "rate_table_version": audit_log.table_version(rate_table),
             "page": "quotation"
         })
+        audit_log.record_quote(session_quote())
+
+        script_span.stop()
 
         st.rerun()
 
 # --- PAGE 2: QUOTATION ---
 elif st.session_state.page == "quotation":
+    # Keep the presenter details once the form widgets are gone, then start
+    # rendering the PDF so it is ready by the time the agent asks for it.
+    for key in ("presenter_name_display", "distribution_channel_display", "presenter_code_display"):
+        st.session_state[key] = st.session_state.get(key, "")
+    start_pdf_render()
+
     st.markdown("<div class='main-container'>", unsafe_allow_html=True)
 
     # --- HEADER SECTION ---
@@ -333,34 +274,6 @@ elif st.session_state.page == "quotation":
         base = st.session_state.get("base", 0.0)
         phcf = st.session_state.get("phcf", 0.0)
 
-        # --- STYLING FOR INFO BOXES ---
-        st.markdown(
-            """
-            <style>
-            .info-box {
-                background-color: #f9f9f9;
-                padding: 12px 16px;
-                border-radius: 10px;
-                border: 1px solid #e0e0e0;
-                box-shadow: 0px 1px 3px rgba(0,0,0,0.1);
-                margin-bottom: 10px;
-            }
-            .info-label {
-                color: #004080;
-                font-weight: 600;
-                font-size: 15px;
-                margin-bottom: 2px;
-            }
-            .info-value {
-                font-size: 14px;
-                color: #333333;
-                margin-top: 0;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True
-        )
-
         # --- DISPLAY DETAILS IN 3 COLUMNS ---
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -395,6 +308,22 @@ elif st.session_state.page == "quotation":
 
         st.markdown("</div>", unsafe_allow_html=True)
 
+        # --- COMPARISON VIEW ---
+        # Every cell comes from one vectorized premium_grid.compare() call,
+        # so exploring what-ifs needs no form resubmission.
+        with st.expander("📊 Compare Options (risk class, age, sum assured)"):
+            comparison = session_comparison()
+            st.caption("Total monthly premiums (KShs), including PHCF levy and stamp duty.")
+            by_age_tab, by_sum_tab = st.tabs([f"By Age (Sum Assured {comparison.sum_assured:,.0f})",
+                                              f"By Sum Assured (Age {comparison.age})"])
+            with by_age_tab:
+                st.dataframe(heatmap(comparison.by_age, [f"Age {a}" for a in comparison.ages]),
+                             use_container_width=True)
+            with by_sum_tab:
+                st.dataframe(heatmap(comparison.by_sum, [f"{s:,.0f}" for s in comparison.sums_assured]),
+                             use_container_width=True)
+            st.checkbox("Add this comparison as a page in the PDF", key="pdf_comparison")
+
         # --- TAX RELIEF SECTION ---
         st.markdown(
             """
@@ -486,20 +415,14 @@ elif st.session_state.page == "quotation":
         # --- ACTION BUTTONS ---
         if st.button(" Go Back", use_container_width=True):
             st.session_state.page = "form"
+            script_span.stop()
             st.rerun()
 
-        if st.button("⬇️ Download Quotation (PDF)", use_container_width=True):
-        # Ensure presenter details are saved before PDF generation
-           st.session_state["presenter_name_display"] = st.session_state.get("presenter_name_display", presenter_name)
-           st.session_state["distribution_channel_display"] = st.session_state.get("distribution_channel_display", distribution_channel)
-           st.session_state["presenter_code_display"] = st.session_state.get("presenter_code_display", presenter_code)
+        pdf_future = start_pdf_render()
+        if pdf_future is not None and pdf_future.done():
+            pdf_download_button(pdf_future)
+        else:
+            pending_pdf_download()
 
-           pdf_bytes = generate_pdf()
-
-           st.download_button(
-               label="Click here to download PDF",
-               data=pdf_bytes,
-               file_name="Platinum_Life_Quotation.pdf",
-               mime="application/pdf",
-               use_container_width=True
-        )
+# --- RECORD SCRIPT RUN TIME ---
+script_span.stop()
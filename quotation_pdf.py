@@ -0,0 +1,248 @@
+# ==========================================================
+# Platinum Life Quotation PDF
+# Renders quotation PDFs from plain quote records so batch jobs
+# and services can reuse it; ReportLab is imported on first use.
+# The logo is decoded and encoded once per process (through
+# ReportLab internals; plain drawImage if those change) and the
+# static page furniture is drawn from fixed layout constants, so
+# each quote only stamps its own fields.
+# ==========================================================
+
+import os
+import copy
+import logging
+import threading
+from io import BytesIO
+
+from rating_engine import LOGO_PATH
+from premium_grid import RISK_CLASSES
+
+# --- PAGE LAYOUT ---
+# Baselines are measured down from the top edge of the page.
+DARK_BLUE = (0, 0, 0.6)
+LOGO_WIDTH, LOGO_HEIGHT = 100, 60
+SECTION_HEADINGS = [
+    (140, 14, "Client Details:"),
+    (275, 14, "Premium Breakdown:"),
+    (355, 14, "Total Monthly Premium:"),
+    (425, 14, "Presenter Details:"),
+    (515, 14, "Tax Relief:"),
+    (595, 12, "Disclaimer:"),
+]
+TAX_RELIEF_TEXT = (535, "Enjoy up to Kshs 60,000 per year in tax relief.")
+DISCLAIMER_TEXT = (
+    "Liberty Life has taken all reasonable steps towards ensuring that the information represented herein is true, "
+    "current and accurate. The illustrative values represented here are based on stated assumptions and are indicative "
+    "rates only. The figures may vary dependent on factors such as the age and gender of client. Accordingly, Liberty "
+    "Life cannot be held liable for any damages arising from any transactions or omissions and the resultant actions "
+    "arising from the information contained in the illustrative values."
+)
+DISCLAIMER_TOP = 630
+QUOTE_LINES = [
+    (160, "Helvetica", 12, "Client Name: {client_name}"),
+    (175, "Helvetica", 12, "Age: {age}"),
+    (190, "Helvetica", 12, "Gender: {gender}"),
+    (205, "Helvetica", 12, "Smoker: {smoker}"),
+    (220, "Helvetica", 12, "Education Level: {education}"),
+    (235, "Helvetica", 12, "Sum Assured: KShs {sum_assured:,.2f}"),
+    (295, "Helvetica", 12, "Base Premium: KShs {base:,.2f}"),
+    (310, "Helvetica", 12, "PHCF Levy: KShs {phcf:,.2f}"),
+    (325, "Helvetica", 12, "Stamp Duty: KShs {stamp:,.2f}"),
+    (375, "Helvetica-Bold", 13, "KShs {total:,.2f}"),
+    (445, "Helvetica", 12, "Presenter Name: {presenter_name}"),
+    (460, "Helvetica", 12, "Distribution Channel: {distribution_channel}"),
+    (475, "Helvetica", 12, "Presenter Code: {presenter_code}"),
+]
+QUOTE_DEFAULTS = {
+    "client_name": "", "age": 0, "gender": "", "smoker": "", "education": "", "sum_assured": 0,
+    "base": 0.0, "phcf": 0.0, "stamp": 40.0, "total": 0.0,
+    "presenter_name": "", "distribution_channel": "", "presenter_code": "",
+    "comparison": None,  # premium_grid.Comparison -> extra comparison page
+}
+
+# --- COMPARISON PAGE ---
+COMPARISON_TOP = 130
+COMPARISON_ROW_HEIGHT = 13
+COMPARISON_LABEL_WIDTH = 68
+COMPARISON_COLUMN_WIDTH = 53
+COMPARISON_NOTE = "Total monthly premiums (KShs) for each risk class, including PHCF levy and stamp duty."
+
+# --- CACHED LOGO ---
+_logo_cache = {}
+_logo_lock = threading.Lock()
+_logo_fast_path = True  # cleared for the process if ReportLab's internals ever reject the cached logo
+
+logger = logging.getLogger("premium_rater.pdf")
+
+def _encoded_logo(logo_path):
+    """Returns the logo as a compressed image XObject, decoding the PNG only when the file changes."""
+    from reportlab.pdfbase import pdfdoc
+    from reportlab.pdfgen.canvas import _digester
+
+    mtime = os.stat(logo_path).st_mtime_ns
+    cached = _logo_cache.get(logo_path)
+    if cached is None or cached[0] != mtime:
+        with _logo_lock:
+            cached = _logo_cache.get(logo_path)
+            if cached is None or cached[0] != mtime:
+                # Same name drawImage derives for this file, so it finds the pre-registered object.
+                name = _digester(f"{logo_path}auto".encode("utf-8"))
+                image = pdfdoc.PDFImageXObject(name, logo_path, mask="auto")
+                image.name = name
+                cached = _logo_cache[logo_path] = (mtime, image)
+    return cached[1]
+
+def _can_reuse_logo(c):
+    """Whether this ReportLab exposes the canvas internals the cached logo is registered through."""
+    doc = getattr(c, "_doc", None)
+    return hasattr(c, "_setXObjects") and all(
+        hasattr(doc, name) for name in ("idToObject", "getXObjectName", "Reference", "addForm"))
+
+def _register_logo(c, cached):
+    """Adds a per-document copy of the cached XObject under the name drawImage looks up."""
+    image = copy.copy(cached)
+    reg_name = c._doc.getXObjectName(image.name)
+    if reg_name not in c._doc.idToObject:
+        c._setXObjects(image)
+        c._doc.Reference(image, reg_name)
+        c._doc.addForm(image.name, image)
+        smask = getattr(cached, "_smask", None)
+        if smask is not None:
+            smask = copy.copy(smask)
+            c._setXObjects(smask)
+            image.smask = c._doc.Reference(smask, c._doc.getXObjectName(smask.name))
+            del image._smask
+
+def _draw_logo(c, logo_path, x, y):
+    """Places the logo with drawImage, registering a per-document copy of the cached XObject first.
+
+    The cache relies on ReportLab internals (requirements.txt pins the tested releases); if
+    they are missing or behave differently, drawImage simply embeds the PNG itself.
+    """
+    global _logo_fast_path
+    if _logo_fast_path and _can_reuse_logo(c):
+        try:
+            _register_logo(c, _encoded_logo(logo_path))
+        except Exception:  # noqa: BLE001 - any failure here must not cost the PDF
+            _logo_fast_path = False
+            logger.exception("cached logo rejected by this ReportLab; embedding the PNG per document")
+    c.drawImage(logo_path, x, y, width=LOGO_WIDTH, height=LOGO_HEIGHT, preserveAspectRatio=True, mask='auto')
+
+# --- PDF GENERATION ---
+def _draw_static_layout(c, width, height, logo_path):
+    """Draws everything that is identical on every quotation."""
+    from reportlab.lib import colors
+
+    # --- Header Logo (Top Right) ---
+    if logo_path and os.path.exists(logo_path):
+        _draw_logo(c, logo_path, width - LOGO_WIDTH - 50, height - LOGO_HEIGHT - 40)
+
+    # --- Header Title ---
+    c.setFillColorRGB(*DARK_BLUE)
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(50, height - 80, "PLATINUM LIFE QUOTATION")
+
+    # --- Draw Line ---
+    c.setStrokeColorRGB(*DARK_BLUE)
+    c.setLineWidth(1)
+    c.line(50, height - 90, width - 50, height - 90)
+
+    # --- Section Headings ---
+    for offset, size, heading in SECTION_HEADINGS:
+        c.setFont("Helvetica-Bold", size)
+        c.drawString(50, height - offset, heading)
+
+    # --- Tax Relief & Disclaimer ---
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 12)
+    offset, text = TAX_RELIEF_TEXT
+    c.drawString(70, height - offset, text)
+    c.setFont("Helvetica", 10)
+    text_obj = c.beginText(70, height - DISCLAIMER_TOP)
+    text_obj.textLines(DISCLAIMER_TEXT)
+    c.drawText(text_obj)
+
+def _draw_quote_page(c, quote, logo_path):
+    from reportlab.lib.pagesizes import A4
+
+    width, height = A4
+    _draw_static_layout(c, width, height, logo_path)
+
+    # --- Quote Fields ---
+    values = {**QUOTE_DEFAULTS, **quote}
+    for offset, font, size, template in QUOTE_LINES:
+        c.setFont(font, size)
+        c.drawString(70, height - offset, template.format(**values))
+    c.showPage()
+
+    if values["comparison"]:
+        _draw_comparison_page(c, values["comparison"], logo_path)
+
+def _draw_comparison_table(c, top, title, row_labels, rows, highlight):
+    """Draws one risk-class table; returns the baseline below it. The `highlight` row is bold."""
+    c.setFillColorRGB(*DARK_BLUE)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, top, title)
+    top -= 14
+    c.setFont("Helvetica-Bold", 7)
+    for line in range(3):
+        x = 50 + COMPARISON_LABEL_WIDTH
+        for risk_class in RISK_CLASSES:
+            x += COMPARISON_COLUMN_WIDTH
+            c.drawRightString(x - 3, top - line * 8, risk_class[line])
+    top -= 16 + COMPARISON_ROW_HEIGHT
+
+    c.setFillColorRGB(0, 0, 0)
+    for label, row in zip(row_labels, rows):
+        c.setFont("Helvetica-Bold" if label == highlight else "Helvetica", 8)
+        c.drawString(50, top, label)
+        x = 50 + COMPARISON_LABEL_WIDTH
+        for total in row:
+            x += COMPARISON_COLUMN_WIDTH
+            c.drawRightString(x - 3, top, f"{total:,.2f}")
+        top -= COMPARISON_ROW_HEIGHT
+    return top
+
+def _draw_comparison_page(c, comparison, logo_path):
+    from reportlab.lib.pagesizes import A4
+
+    width, height = A4
+    if logo_path and os.path.exists(logo_path):
+        _draw_logo(c, logo_path, width - LOGO_WIDTH - 50, height - LOGO_HEIGHT - 40)
+    c.setFillColorRGB(*DARK_BLUE)
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(50, height - 80, "PREMIUM COMPARISON")
+    c.setStrokeColorRGB(*DARK_BLUE)
+    c.setLineWidth(1)
+    c.line(50, height - 90, width - 50, height - 90)
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont("Helvetica", 9)
+    c.drawString(50, height - 108, COMPARISON_NOTE)
+
+    top = _draw_comparison_table(
+        c, height - COMPARISON_TOP, f"By age, Sum Assured KShs {comparison.sum_assured:,.0f}",
+        [f"Age {age}" for age in comparison.ages], comparison.by_age, f"Age {comparison.age}")
+    _draw_comparison_table(
+        c, top - 20, f"By sum assured, Age {comparison.age}",
+        [f"{sum_assured:,.0f}" for sum_assured in comparison.sums_assured], comparison.by_sum,
+        f"{comparison.sum_assured:,.0f}")
+    c.showPage()
+
+def render_quotation_pdf(quote, logo_path=LOGO_PATH):
+    """Generates a simple PDF quotation using ReportLab from a quote record."""
+    return render_quotation_pages([quote], logo_path)
+
+def render_quotation_pages(quotes, logo_path=LOGO_PATH):
+    """Renders one page per quote record into a single PDF; the logo is embedded once."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    for quote in quotes:
+        _draw_quote_page(c, quote, logo_path)
+
+    # --- Save PDF ---
+    c.save()
+    buffer.seek(0)
+    return buffer
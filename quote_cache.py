@@ -0,0 +1,133 @@
+# ==========================================================
+# Platinum Life Quote Cache
+# Process-wide memoization of premium results and rendered
+# quotation PDFs. Both caches are bounded (entry count / byte
+# budget) with least-recently-used eviction and keep hit/miss
+# counters, so repeat requests cost a dictionary lookup. Premiums
+# on the form's grid skip the cache and read premium_grid directly.
+# ==========================================================
+
+import threading
+from collections import OrderedDict
+
+import rating_engine
+import premium_grid
+
+# --- CACHE LIMITS ---
+PREMIUM_CACHE_ENTRIES = 50_000
+PDF_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by entry count and/or total size, with hit/miss counters."""
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key][0]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while self._data and (
+                (self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Returns the cached value for `key`, calling `compute()` and storing its result on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+premium_cache = LRUCache(max_entries=PREMIUM_CACHE_ENTRIES)
+pdf_cache = LRUCache(max_bytes=PDF_CACHE_BYTES, sizeof=len)
+
+# --- KEYS ---
+def premium_key(age, gender, smoker, education, sum_assured):
+    return int(age), gender, smoker, education, float(sum_assured)
+
+def pdf_key(quote):
+    """Quote-plus-presenter payload; missing fields take the renderer's defaults.
+
+    Value types are part of the key because they change the rendered text (30 vs 30.0).
+    """
+    from quotation_pdf import QUOTE_DEFAULTS
+
+    return tuple((type(value).__name__, value) for value in
+                 (quote.get(field, default) for field, default in QUOTE_DEFAULTS.items()))
+
+# --- CACHED OPERATIONS ---
+def cached_premium(age, gender, smoker, education, sum_assured, table=None):
+    """rating_engine.calculate_premium, memoized per rate-table version.
+
+    On-grid quotes are read straight from the precomputed premium grid.
+    """
+    if table is None:
+        table = rating_engine.load_rate_table()
+    result = premium_grid.grid_for(table).lookup(age, gender, smoker, education, sum_assured)
+    if result is not None:
+        return result
+    key = (table.checksum, table.version, *premium_key(age, gender, smoker, education, sum_assured))
+    return premium_cache.get_or_compute(
+        key, lambda: rating_engine.calculate_premium(age, gender, smoker, education, sum_assured, table))
+
+def cached_quotation_pdf(quote):
+    """Rendered quotation PDF bytes for `quote`, memoized on the normalized payload."""
+    from quotation_pdf import render_quotation_pdf
+
+    return pdf_cache.get_or_compute(pdf_key(quote), lambda: render_quotation_pdf(quote).getvalue())
+
+def cache_stats():
+    return {"premium": premium_cache.stats(), "pdf": pdf_cache.stats()}
@@ -0,0 +1,246 @@
+# ==========================================================
+# Platinum Life Portfolio Quotation Report
+# Quotes a client portfolio (CSV/XLSX) chunk by chunk and writes it
+# in the layout of the on-screen "QUOTATION DETAILS" card: client
+# fields, base premium, PHCF (0.25%), stamp duty and total monthly
+# premium, followed by a summary totals row. XLSX is written with
+# openpyxl in write-only mode (rows stream to disk, with number
+# formats) and CSV with rounded amounts, so memory stays flat for
+# any portfolio size. Reports rows/second as it goes.
+# Usage: python quote_report.py clients.xlsx -o portfolio_quotes.xlsx
+#            [--chunksize 50000] [--rates workbook.xlsx]
+# ==========================================================
+
+import os
+import sys
+import csv
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import rating_engine
+import rate_registry
+from batch_quote import (CATEGORY_COLUMNS, NUMERIC_COLUMNS, OUTPUT_COLUMNS, is_excel, iter_chunks, normalize_category,
+                         normalize_header, print_progress, quote_frame)
+
+# --- REPORT LAYOUT ---
+# (header, field, Excel number format); fields are normalized input
+# headers or batch_quote output columns.
+REPORT_COLUMNS = [
+    ("Client Name", "client_name", None),
+    ("Age (Last Birthday)", "age", "0"),
+    ("Gender", "gender", None),
+    ("Smoker Status", "smoker", None),
+    ("Education Level", "education", None),
+    ("Sum Assured (KShs)", "sum_assured", "#,##0"),
+    ("Base Premium (KShs)", OUTPUT_COLUMNS["base"], "#,##0.00"),
+    ("PHCF (0.25%) (KShs)", OUTPUT_COLUMNS["phcf"], "#,##0.00"),
+    ("Stamp Duty (KShs)", OUTPUT_COLUMNS["stamp"], "#,##0.00"),
+    ("Total Monthly Premium (KShs)", OUTPUT_COLUMNS["total"], "#,##0.00"),
+    ("Error", OUTPUT_COLUMNS["error"], None),
+]
+TOTAL_FIELDS = ["sum_assured", *(OUTPUT_COLUMNS[key] for key in ("base", "phcf", "stamp", "total"))]
+COLUMN_WIDTHS = [28, 10, 10, 14, 16, 18, 18, 18, 16, 22, 36]
+HEADER_FILL = "003366"  # card border/heading blue
+CSV_FORMATS = {"0": "%.0f", "#,##0": "%.0f", "#,##0.00": "%.2f"}  # Excel number format -> CSV text
+DEFAULT_CHUNKSIZE = 50_000
+
+def report_frame(quoted):
+    """The report columns of a quote_frame result, in card order; missing client fields are blank.
+
+    Gender, smoker and education show the normalized values the row was priced with; ages
+    and sums assured are numbers wherever the input cell held one.
+    """
+    columns = {normalize_header(column): column for column in quoted.columns}
+    frame = pd.DataFrame({field: quoted[columns[field]] if field in columns else ""
+                          for _, field, _ in REPORT_COLUMNS}, index=quoted.index)
+    for field in CATEGORY_COLUMNS:
+        frame[field] = normalize_category(frame[field])
+    for field in NUMERIC_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(frame[field]):
+            numbers = pd.to_numeric(frame[field], errors="coerce")
+            frame[field] = numbers.astype(object).where(numbers.notna(), frame[field])
+    return frame
+
+
+class Totals:
+    """Running sums over quoted rows, so the summary row needs no second pass."""
+
+    def __init__(self):
+        self.rows = 0
+        self.flagged = 0
+        self.sums = dict.fromkeys(TOTAL_FIELDS, 0.0)
+
+    def add(self, frame):
+        quoted = frame[frame[OUTPUT_COLUMNS["error"]] == ""]
+        self.rows += len(frame)
+        self.flagged += len(frame) - len(quoted)
+        for field in TOTAL_FIELDS:
+            self.sums[field] += float(np.nansum(pd.to_numeric(quoted[field], errors="coerce")))
+
+    def row(self):
+        label = f"TOTAL ({self.rows - self.flagged:,} quoted, {self.flagged:,} flagged)"
+        return [label if field == "client_name" else self.sums.get(field) for _, field, _ in REPORT_COLUMNS]
+
+# --- WRITERS ---
+class XlsxReportWriter:
+    """Streams report rows into a write-only openpyxl workbook with per-column number formats."""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+
+        self.path = path
+        self._cell = WriteOnlyCell
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Quotations")
+        self._sheet.freeze_panes = "A2"
+        for index, width in enumerate(COLUMN_WIDTHS):
+            self._sheet.column_dimensions[chr(ord("A") + index)].width = width
+
+        # One style per column, shared by every cell written in it.
+        self._styles = []
+        for _, _, number_format in REPORT_COLUMNS:
+            template = WriteOnlyCell(self._sheet)
+            if number_format:
+                template.number_format = number_format
+            self._styles.append(template._style if number_format else None)
+        self._total_styles = []
+        for _, _, number_format in REPORT_COLUMNS:
+            template = WriteOnlyCell(self._sheet)
+            template.font = Font(bold=True)
+            if number_format:
+                template.number_format = number_format
+            self._total_styles.append(template._style)
+
+        header = []
+        for title, _, _ in REPORT_COLUMNS:
+            cell = WriteOnlyCell(self._sheet, title)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill("solid", fgColor=HEADER_FILL)
+            header.append(cell)
+        self._sheet.append(header)
+
+    def _row(self, values, styles):
+        row = []
+        for value, style in zip(values, styles):
+            if isinstance(value, float) and value != value:  # NaN premium on a flagged row
+                value = None
+            if style is None:
+                row.append(value)
+            else:
+                cell = self._cell(self._sheet, value)
+                cell._style = style
+                row.append(cell)
+        return row
+
+    def write(self, frame):
+        for values in frame.itertuples(index=False, name=None):
+            self._sheet.append(self._row(values, self._styles))
+
+    def close(self, totals=None):
+        if totals is not None:
+            self._sheet.append(self._row(totals.row(), self._total_styles))
+        self._workbook.save(self.path)
+
+
+def _csv_text(values, number_format):
+    """A report column as CSV text: amounts to cents, ages and sums assured as whole numbers.
+
+    Values that are not numbers (or not whole, for the integer formats) are written as they are.
+    """
+    text = values.astype(object).where(values.notna(), "")
+    numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    ok = np.isfinite(numbers)
+    if CSV_FORMATS[number_format] == "%.0f":
+        ok &= numbers == np.floor(numbers)
+    text[ok] = np.char.mod(CSV_FORMATS[number_format], numbers[ok])
+    return text
+
+class CsvReportWriter:
+    """Appends report rows to CSV, formatting numbers the way the XLSX report displays them."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._first = True
+
+    def write(self, frame):
+        frame = pd.DataFrame({field: _csv_text(frame[field], number_format) if number_format else frame[field]
+                              for _, field, number_format in REPORT_COLUMNS}, index=frame.index)
+        frame.to_csv(self._file, index=False, header=[title for title, _, _ in REPORT_COLUMNS] if self._first else False)
+        self._first = False
+
+    def close(self, totals=None):
+        if totals is not None:
+            self.write(pd.DataFrame([totals.row()], columns=[field for _, field, _ in REPORT_COLUMNS]))
+        elif self._first:
+            csv.writer(self._file).writerow([title for title, _, _ in REPORT_COLUMNS])
+        self._file.close()
+
+def report_writer(path):
+    if is_excel(path):
+        if os.path.splitext(path)[1].lower() != ".xlsx":
+            raise ValueError("Excel reports are written as .xlsx")
+        return XlsxReportWriter(path)
+    return CsvReportWriter(path)
+
+# --- EXPORT ---
+def export_report(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE, table=None, progress=None):
+    """Quotes `input_path` chunk by chunk into a report at `output_path`; returns the Totals.
+
+    `progress`, if given, is called after every chunk with (rows, flagged, elapsed seconds).
+    """
+    if table is None:
+        table = rate_registry.current_table(watch=False)
+    writer = report_writer(output_path)
+    totals = Totals()
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(input_path, chunksize):
+            frame = report_frame(quote_frame(chunk, table))
+            writer.write(frame)
+            totals.add(frame)
+            if progress:
+                progress(totals.rows, totals.flagged, time.perf_counter() - start)
+    except BaseException:
+        writer.close()
+        raise
+    writer.close(totals)
+    return totals
+
+def default_output_path(input_path):
+    stem, _ = os.path.splitext(input_path)
+    return f"{stem}_quotation_report.xlsx"
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a formatted quotation report for a client portfolio.")
+    parser.add_argument("input", help="CSV or XLSX file with age, gender, smoker, education and sum_assured columns")
+    parser.add_argument("-o", "--output", help="XLSX or CSV report to write (default: <input>_quotation_report.xlsx)")
+    parser.add_argument("--rates", help="rates workbook to quote against (default: the registry version in force)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows quoted and written per chunk (default: {DEFAULT_CHUNKSIZE:,})")
+    args = parser.parse_args(argv)
+    output = args.output or default_output_path(args.input)
+    if args.chunksize < 1:
+        parser.error("--chunksize must be a positive number of rows")
+
+    start = time.perf_counter()
+    table = rating_engine.load_rate_table(args.rates) if args.rates else rate_registry.current_table(watch=False)
+    try:
+        totals = export_report(args.input, output, args.chunksize, table, progress=print_progress)
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - start
+
+    print(f"Reported {totals.rows:,} rows ({totals.flagged:,} flagged), total monthly premium "
+          f"KShs {totals.sums[OUTPUT_COLUMNS['total']]:,.2f}, in {elapsed:.2f}s "
+          f"({totals.rows / elapsed:,.0f} rows/s) -> {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
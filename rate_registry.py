@@ -0,0 +1,188 @@
+# ==========================================================
+# Platinum Life Rate Table Registry
+# Versioned rate tables for repricing without restarts. Workbooks
+# named "Per Mille rates data_v<N>[_<YYYY-MM-DD>].xlsx" in the rates
+# directory are versions vN, effective from the given date (or
+# always, without one). The table in force is the highest version
+# whose effective date has arrived.
+#
+# Each version is compiled once per process and shared read-only.
+# A daemon thread rescans the directory; new or replaced workbooks
+# are compiled (and their premium grid built) in the background,
+# then the version list is swapped in a single assignment, so
+# sessions never see a half-loaded table. Superseded versions are
+# only weakly referenced and drop out of memory once no caller
+# still holds them.
+#
+# PREMIUM_RATER_RATES_DIR sets the directory (default: next to the app).
+# Usage: python rate_registry.py   (list versions)
+# ==========================================================
+
+import os
+import re
+import sys
+import time
+import logging
+import weakref
+import threading
+from datetime import date
+
+import rating_engine
+import premium_grid
+
+RATES_DIR = os.environ.get("PREMIUM_RATER_RATES_DIR") or rating_engine.BASE_PATH
+FILE_PATTERN = re.compile(r"^Per Mille rates data_v(?P<number>\d+)(?:_(?P<effective>\d{4}-\d{2}-\d{2}))?\.xlsx$")
+POLL_INTERVAL = 5.0
+
+logger = logging.getLogger("premium_rater.rates")
+
+
+class RateVersion:
+    """One workbook in the registry; `table` is None until the version is loaded."""
+
+    __slots__ = ("name", "number", "effective", "path", "file_version", "table")
+
+    def __init__(self, number, effective, path, file_version, table=None):
+        self.name = f"v{number}"
+        self.number = number
+        self.effective = effective
+        self.path = path
+        self.file_version = file_version
+        self.table = table
+
+
+def scan(directory=RATES_DIR):
+    """RateVersions (unloaded) for every matching workbook, in the order they take effect."""
+    versions = []
+    for entry in os.scandir(directory):
+        match = FILE_PATTERN.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        effective = date.fromisoformat(match["effective"]) if match["effective"] else date.min
+        stat = entry.stat()
+        versions.append(RateVersion(int(match["number"]), effective, entry.path, (stat.st_mtime_ns, stat.st_size)))
+    versions.sort(key=lambda v: (v.effective, v.number))
+    return versions
+
+def in_force(versions, on):
+    """The last version effective on `on` from a list sorted by scan(), or None."""
+    current = None
+    for version in versions:
+        if version.effective <= on:
+            current = version
+    return current
+
+
+class RateRegistry:
+    """Process-wide set of loaded rate-table versions with background hot reload."""
+
+    def __init__(self, directory=RATES_DIR, poll_interval=POLL_INTERVAL):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._versions = ()  # loaded versions still in force or not yet effective
+        self._retired = weakref.WeakValueDictionary()  # name -> superseded RateTable still in use
+        self._failed = {}  # path -> file version that did not load; retried once the file changes
+        self._lock = threading.RLock()
+        self._watcher = None
+
+    def refresh(self, on=None, export=False):
+        """Loads new or changed versions that are (or will be) in force, then swaps the list in.
+
+        `export` also refreshes the in-force version's offline grid exports in the background.
+        """
+        on = on or date.today()
+        with self._lock:
+            loaded = {v.path: v for v in self._versions}
+            versions = []
+            for version in reversed(scan(self.directory)):  # newest first
+                version = self._load(version, loaded.get(version.path))
+                if version is not None:
+                    versions.append(version)
+                    if version.effective <= on:
+                        break  # in force: everything older is superseded
+            versions.reverse()
+
+            for version in self._versions:
+                if version not in versions:
+                    self._retired[version.name] = version.table
+            self._versions = tuple(versions)
+        in_effect = in_force(self._versions, on)
+        if in_effect is not None:
+            premium_grid.grid_for(in_effect.table, export=export)
+
+    def _load(self, version, previous):
+        """`version` with its table loaded, `previous` if the file is unchanged or fails to load."""
+        if previous is not None and previous.file_version == version.file_version:
+            return previous
+        if self._failed.get(version.path) == version.file_version:
+            return previous
+        try:
+            version.table = rating_engine.open_rate_table(version.path, version.file_version)
+            version.table.name = version.name
+            premium_grid.build_grid(version.table)  # fail before the swap, not on the first quote
+        except Exception:  # noqa: BLE001 - keep serving the old version
+            logger.exception("could not load rate table %s", version.path)
+            self._failed[version.path] = version.file_version
+            return previous
+        return version
+
+    def current(self, on=None, watch=True):
+        """The RateTable in force on `on` (default today); raises FileNotFoundError if there is none.
+
+        With `watch=False` (one-shot CLIs) the directory is scanned once and no watcher starts.
+        """
+        if self._watcher is None:
+            if watch:
+                self._start()
+            elif not self._versions:
+                self.refresh()
+        version = in_force(self._versions, on or date.today())
+        if version is None:
+            raise FileNotFoundError(f"No rate table workbook in force in {self.directory}")
+        return version.table
+
+    def get(self, name):
+        """A loaded table by version name ("v2"), including superseded ones still in use; None otherwise."""
+        for version in self._versions:
+            if version.name == name:
+                return version.table
+        return self._retired.get(name)
+
+    def versions(self):
+        return [{"name": v.name, "effective": v.effective.isoformat() if v.effective != date.min else None,
+                 "path": os.path.basename(v.path)} for v in self._versions]
+
+    def _start(self):
+        with self._lock:
+            if self._watcher is None:
+                self.refresh(export=True)  # the first load is synchronous: nothing can be quoted without it
+                self._watcher = threading.Thread(target=self._watch, name="rate-registry", daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh(export=True)
+            except OSError:
+                logger.exception("could not scan %s", self.directory)
+
+
+registry = RateRegistry()
+
+def current_table(on=None, watch=True):
+    return registry.current(on, watch)
+
+# --- COMMAND LINE ---
+def main():
+    registry.refresh()
+    current = in_force(registry._versions, date.today())
+    for version in scan(RATES_DIR):
+        state = "in force" if current and version.name == current.name else (
+            "loaded" if registry.get(version.name) is not None else "superseded")
+        effective = version.effective.isoformat() if version.effective != date.min else "always"
+        print(f"{version.name:<5} effective {effective:<10} {state:<10} {os.path.basename(version.path)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# ==========================================================
+# Platinum Life Rating Engine
+# Headless premium maths and rate table shared by the Streamlit
+# app, batch jobs and services. Importing this module has no UI
+# side effects; pandas/openpyxl are only loaded to parse the workbook.
+# The parsed table is cached as a binary snapshot next to the workbook
+# and memory-mapped read-only, so workers start without parsing xlsx.
+# Usage: python rating_engine.py [workbook ...]   (compile snapshots)
+# ==========================================================
+
+import os
+import sys
+import struct
+import hashlib
+import threading
+
+import numpy as np
+
+import instrumentation
+
+# --- FILE PATHS ---
+BASE_PATH = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_PATH, "Per Mille rates data_v1.xlsx")
+LOGO_PATH = os.path.join(BASE_PATH, "Company logo.png")
+
+# --- RATE TABLE LAYOUT ---
+# Workbook columns are ordered gender -> smoker -> education, which maps
+# directly onto the last three axes of the compiled rate array.
+GENDERS = ["Male", "Female"]
+SMOKER_STATUSES = ["Smoker", "Non Smoker"]
+EDUCATION_LEVELS = ["Tertiary", "Non Tertiary"]
+RATE_COLUMNS = [f"{g} {s} {e}" for g in GENDERS for s in SMOKER_STATUSES for e in EDUCATION_LEVELS]
+
+GENDER_CODES = {name: code for code, name in enumerate(GENDERS)}
+SMOKER_CODES = {name: code for code, name in enumerate(SMOKER_STATUSES)}
+EDUCATION_CODES = {name: code for code, name in enumerate(EDUCATION_LEVELS)}
+
+# --- CHARGES ---
+PHCF_RATE = 0.0025
+STAMP_DUTY = 40
+
+# --- PRODUCT LIMITS ---
+MIN_ENTRY_AGE, MAX_ENTRY_AGE = 18, 55
+MIN_SUM_ASSURED, MAX_SUM_ASSURED = 1_000_000, 35_000_000
+SUM_ASSURED_STEP = 500_000
+
+
+class RateTable:
+    """Per-mille rates compiled into an array of shape (age offset, gender, smoker, education).
+
+    `name` is the registry version label (e.g. "v2") and `source` the workbook path, when known.
+    """
+
+    def __init__(self, rates, min_age, version=None, checksum=None, name="", source=None):
+        rates.flags.writeable = False
+        self.rates = rates
+        self.min_age = min_age
+        self.version = version
+        self.checksum = checksum
+        self.name = name
+        self.source = source
+
+    @property
+    def max_age(self):
+        return self.min_age + len(self.rates) - 1
+
+    def rate(self, age, gender, smoker, education):
+        offset = int(age) - self.min_age
+        try:
+            codes = GENDER_CODES[gender], SMOKER_CODES[smoker], EDUCATION_CODES[education]
+        except KeyError as exc:
+            raise ValueError(f"Unknown risk class value: {exc.args[0]!r}") from None
+        rate = np.nan
+        if 0 <= offset < len(self.rates):
+            rate = self.rates[(offset, *codes)].item()
+        if np.isnan(rate):
+            raise ValueError(f"No matching rate found for age {age}.")
+        return rate
+
+
+# --- LOAD DATA ---
+def rate_table_version(path):
+    """Cheap fingerprint of the workbook; changes whenever the file is replaced or edited."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def source_checksum(path):
+    """SHA-256 of the workbook bytes, stored in snapshots to detect stale ones."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+def compile_rate_table(path, version=None):
+    """Parses the rates workbook into a RateTable."""
+    import pandas as pd
+
+    with instrumentation.span("workbook_load"):
+        df = pd.read_excel(path)
+    ages = df["Age"].to_numpy()
+    min_age = int(ages.min())
+    rates = np.full((int(ages.max()) - min_age + 1, len(GENDERS), len(SMOKER_STATUSES), len(EDUCATION_LEVELS)), np.nan)
+    rates[ages - min_age] = df[RATE_COLUMNS].to_numpy(dtype=np.float64).reshape(-1, *rates.shape[1:])
+    return RateTable(rates, min_age, version)
+
+# --- BINARY SNAPSHOT ---
+# Layout: fixed 64-byte header (magic, format version, min age, number of
+# ages, SHA-256 of the source workbook) followed by the little-endian
+# float64 rate block in C order.
+SNAPSHOT_MAGIC = b"PLRATES\0"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_HEADER = struct.Struct("<8sIiI32s")
+SNAPSHOT_HEADER_SIZE = 64
+SNAPSHOT_CLASS_SHAPE = (len(GENDERS), len(SMOKER_STATUSES), len(EDUCATION_LEVELS))
+
+def snapshot_path(path):
+    return os.path.splitext(path)[0] + ".rates"
+
+def write_snapshot(table, path):
+    """Writes `table` to the snapshot file atomically, so readers never see a partial file."""
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, table.min_age, len(table.rates), table.checksum)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(SNAPSHOT_HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(table.rates, dtype="<f8").tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def read_snapshot(path, checksum, version=None):
+    """Memory-maps a snapshot read-only; returns None if it is missing, malformed or stale."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+        magic, file_format, min_age, n_ages, file_checksum = SNAPSHOT_HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC or file_format != SNAPSHOT_FORMAT or file_checksum != checksum:
+            return None
+        rates = np.memmap(path, dtype="<f8", mode="r", offset=SNAPSHOT_HEADER_SIZE, shape=(n_ages, *SNAPSHOT_CLASS_SHAPE))
+    except (OSError, ValueError, struct.error):
+        return None
+    return RateTable(rates, min_age, version, checksum)
+
+def compile_snapshot(path):
+    """Parses the workbook and (re)writes its snapshot; returns the compiled RateTable."""
+    table = compile_rate_table(path, rate_table_version(path))
+    table.checksum = source_checksum(path)
+    write_snapshot(table, snapshot_path(path))
+    return table
+
+def open_rate_table(path, version=None):
+    """Loads `path` from its snapshot, rebuilding the snapshot when it no longer matches the workbook."""
+    with instrumentation.span("snapshot_load"):
+        checksum = source_checksum(path)
+        table = read_snapshot(snapshot_path(path), checksum, version)
+    if table is None:
+        table = compile_rate_table(path, version)
+        table.checksum = checksum
+        try:
+            write_snapshot(table, snapshot_path(path))
+            table = read_snapshot(snapshot_path(path), checksum, version) or table
+        except OSError:
+            pass  # read-only deployment: keep the in-memory table
+    table.source = path
+    return table
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def load_rate_table(path=DATA_PATH):
+    """Returns the process-wide RateTable for `path`, reloading it only when the file changes."""
+    version = rate_table_version(path)
+    table = _tables.get(path)
+    if table is not None and table.version == version:
+        return table
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None or table.version != version:
+            table = _tables[path] = open_rate_table(path, version)
+    return table
+
+# --- PREMIUM CALCULATION ---
+def calculate_premium(age, gender, smoker, education, sum_assured, table=None):
+    """Returns (base, phcf, stamp, total); raises ValueError when no rate applies."""
+    if table is None:
+        table = load_rate_table()
+    rate = table.rate(age, gender, smoker, education)
+
+    base = (rate / 1000) * sum_assured
+    phcf = PHCF_RATE * base
+    stamp = STAMP_DUTY
+    total = base + phcf + stamp
+    return base, phcf, stamp, total
+
+# --- BATCH CALCULATION ---
+def _encode(values, codes):
+    values = np.asarray(values, dtype=object)
+    encoded = np.full(values.shape, -1, dtype=np.intp)
+    for name, code in codes.items():
+        encoded[values == name] = code
+    return encoded
+
+def quote_batch(age, gender, smoker, education, sum_assured, table=None):
+    """Vectorized calculate_premium over equal-length columns.
+
+    Returns a dict of arrays: base, phcf, stamp, total and error. Rows outside the
+    product limits or with unknown risk classes get NaN premiums and an error
+    message instead of raising; quoted rows have an empty error.
+    """
+    if table is None:
+        table = load_rate_table()
+    age = np.asarray(age, dtype=np.float64)
+    sum_assured = np.asarray(sum_assured, dtype=np.float64)
+    gender_code = _encode(gender, GENDER_CODES)
+    smoker_code = _encode(smoker, SMOKER_CODES)
+    education_code = _encode(education, EDUCATION_CODES)
+
+    with np.errstate(invalid="ignore"):
+        offset = np.clip(np.nan_to_num(age) - table.min_age, 0, len(table.rates) - 1).astype(np.intp)
+        rate = table.rates[offset, gender_code.clip(0), smoker_code.clip(0), education_code.clip(0)]
+        checks = [
+            (~((age >= MIN_ENTRY_AGE) & (age <= MAX_ENTRY_AGE) & (age == np.floor(age))),
+             f"age outside {MIN_ENTRY_AGE}-{MAX_ENTRY_AGE}"),
+            (~((sum_assured >= MIN_SUM_ASSURED) & (sum_assured <= MAX_SUM_ASSURED)),
+             f"sum assured outside {MIN_SUM_ASSURED:,}-{MAX_SUM_ASSURED:,}"),
+            (gender_code < 0, "unknown gender"),
+            (smoker_code < 0, "unknown smoker status"),
+            (education_code < 0, "unknown education level"),
+            (np.isnan(rate) | (age < table.min_age) | (age > table.max_age), "no matching rate for age"),
+        ]
+
+    # Assign in reverse so the first failing check is the one reported.
+    error = np.full(age.shape, "", dtype=object)
+    for mask, message in reversed(checks):
+        error[mask] = message
+    invalid = error != ""
+
+    base = np.where(invalid, np.nan, rate / 1000 * sum_assured)
+    phcf = PHCF_RATE * base
+    stamp = np.where(invalid, np.nan, float(STAMP_DUTY))
+    total = base + phcf + stamp
+    return {"base": base, "phcf": phcf, "stamp": stamp, "total": total, "error": error}
+
+
+if __name__ == "__main__":
+    for workbook in sys.argv[1:] or [DATA_PATH]:
+        compiled = compile_snapshot(workbook)
+        print(f"{workbook} -> {snapshot_path(workbook)} (ages {compiled.min_age}-{compiled.max_age})")
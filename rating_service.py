@@ -0,0 +1,206 @@
+# ==========================================================
+# Platinum Life Rating Service
+# Local async JSON API over the rating engine for CRM and USSD
+# front-ends. Each worker process loads the rate tables once (see
+# rate_registry.py; new versions are picked up without a restart) and
+# shares the premium/PDF caches with every request it serves. PDFs
+# render on the bounded pool in pdf_jobs.py; a full queue answers 503.
+# Usage: python rating_service.py [--port 8000] [--workers 2]
+#
+#   POST /quote   {"age": 34, "gender": "Female", "smoker": "Non Smoker",
+#                  "education": "Tertiary", "sum_assured": 5000000,
+#                  "client_name": "...", "include_pdf": true}
+#   POST /quotes  {"clients": [{...}, ...], "include_pdf": false}  (PDFs: <= 100 clients)
+#   GET  /health
+#   GET  /metrics (Prometheus text; spans need PREMIUM_RATER_METRICS=1)
+# ==========================================================
+
+import sys
+import math
+import base64
+import asyncio
+import argparse
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import rating_engine
+import rate_registry
+import audit_log
+import instrumentation
+import pdf_jobs
+import quote_cache
+
+# --- REQUEST FIELDS ---
+QUOTE_FIELDS = ["age", "gender", "smoker", "education", "sum_assured"]
+TEXT_FIELDS = ["gender", "smoker", "education"]
+CLIENT_FIELDS = ["client_name", "presenter_name", "distribution_channel", "presenter_code"]
+PREMIUM_FIELDS = ["base", "phcf", "stamp", "total"]
+MAX_BATCH_SIZE = 10_000
+MAX_PDF_BATCH_SIZE = 100  # clients per /quotes request with include_pdf
+PDF_SLOT_WAIT = 10.0  # seconds a batch waits for render slots before answering 503
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Busy(Exception):
+    pass
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _check_fields(records):
+    """Rejects values that cannot be priced or echoed back as JSON before anything is quoted.
+
+    Category and client fields must be strings or null; numbers must be finite (1e400,
+    NaN and Infinity parse to floats the response could not serialize).
+    """
+    for i, record in enumerate(records):
+        for field in TEXT_FIELDS + CLIENT_FIELDS:
+            value = record.get(field)
+            if value is not None and not isinstance(value, str):
+                raise BadRequest(f"client {i}: {field} must be a string")
+        for field in ("age", "sum_assured"):
+            value = record.get(field)
+            if isinstance(value, float) and not math.isfinite(value):
+                raise BadRequest(f"client {i}: {field} must be a finite number")
+
+def quote_records(records, table=None):
+    """Prices a list of client dicts in one vectorized call; returns one result dict per record."""
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise BadRequest("expected a list of client objects")
+    _check_fields(records)
+    if table is None:
+        table = rate_registry.current_table()
+    with instrumentation.span("calculate_premium", "service"):
+        result = rating_engine.quote_batch(
+            age=[_number(r.get("age")) for r in records],
+            gender=[r.get("gender") for r in records],
+            smoker=[r.get("smoker") for r in records],
+            education=[r.get("education") for r in records],
+            sum_assured=[_number(r.get("sum_assured")) for r in records],
+            table=table,
+        )
+    version = audit_log.table_version(table)
+    quotes = []
+    for i, record in enumerate(records):
+        quote = {field: record.get(field) for field in QUOTE_FIELDS}
+        quote.update({field: record.get(field) or "" for field in CLIENT_FIELDS})
+        if result["error"][i]:
+            quote["error"] = result["error"][i]
+        else:
+            quote.update({field: float(result[field][i]) for field in PREMIUM_FIELDS})
+            quote["age"] = int(_number(quote["age"]))
+            quote["sum_assured"] = _number(quote["sum_assured"])
+            quote["rate_table_version"] = version
+        quotes.append(quote)
+    audit_log.record_quotes([q for q in quotes if "error" not in q], table)
+    return quotes
+
+async def _attach_pdf(quote, wait=0.0):
+    """Renders `quote` on the shared pool, waiting up to `wait` seconds for a free slot."""
+    deadline = asyncio.get_running_loop().time() + wait
+    future = pdf_jobs.submit(quote, "service")
+    while future is None:
+        if asyncio.get_running_loop().time() >= deadline:
+            raise Busy("PDF render queue is full; retry shortly")
+        await asyncio.sleep(0.05)
+        future = pdf_jobs.submit(quote, "service")
+    pdf_bytes = await asyncio.wrap_future(future)
+    quote["pdf_base64"] = base64.b64encode(pdf_bytes).decode("ascii")
+
+async def _attach_pdfs(quotes):
+    """Renders a batch in groups as wide as the pool, so it uses every worker without filling the queue."""
+    quotes = [quote for quote in quotes if "error" not in quote]
+    group = pdf_jobs.pool.workers
+    for start in range(0, len(quotes), group):
+        await asyncio.gather(*(_attach_pdf(quote, PDF_SLOT_WAIT) for quote in quotes[start:start + group]))
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise BadRequest("request body must be JSON") from None
+
+# --- ENDPOINTS ---
+async def quote_endpoint(request):
+    payload = await _read_json(request)
+    if not isinstance(payload, dict):
+        raise BadRequest("expected a client object")
+    quote = quote_records([payload], rate_registry.current_table())[0]
+    if "error" in quote:
+        return JSONResponse(quote, status_code=422)
+    if payload.get("include_pdf"):
+        await _attach_pdf(quote)
+    return JSONResponse(quote)
+
+async def quotes_endpoint(request):
+    payload = await _read_json(request)
+    records = payload.get("clients") if isinstance(payload, dict) else payload
+    include_pdf = isinstance(payload, dict) and payload.get("include_pdf")
+    if isinstance(records, list) and len(records) > MAX_BATCH_SIZE:
+        raise BadRequest(f"at most {MAX_BATCH_SIZE:,} clients per request")
+    if include_pdf and isinstance(records, list) and len(records) > MAX_PDF_BATCH_SIZE:
+        raise BadRequest(f"at most {MAX_PDF_BATCH_SIZE:,} clients per request with include_pdf; "
+                         "use bulk_quotations.py for mail-outs")
+    table = rate_registry.current_table()
+    quotes = await run_in_threadpool(quote_records, records, table)
+    if include_pdf:
+        await _attach_pdfs(quotes)
+    return JSONResponse({"quotes": quotes, "flagged": sum("error" in q for q in quotes)})
+
+async def health_endpoint(request):
+    table = rate_registry.current_table()
+    return JSONResponse({"status": "ok", "ages": [table.min_age, table.max_age], "rate_table": table.name,
+                         "rate_versions": rate_registry.registry.versions(), "pdf_pool": pdf_jobs.pool.stats(),
+                         "caches": quote_cache.cache_stats()})
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(instrumentation.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+async def bad_request(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+async def busy(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    rate_registry.current_table()  # compile/map the rate table before the first request
+    instrumentation.start_json_logger()
+    yield
+
+app = Starlette(
+    routes=[
+        Route("/quote", quote_endpoint, methods=["POST"]),
+        Route("/quotes", quotes_endpoint, methods=["POST"]),
+        Route("/health", health_endpoint, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    exception_handlers={BadRequest: bad_request, Busy: busy},
+    lifespan=lifespan,
+)
+
+# --- COMMAND LINE ---
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve premium quotes over a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default: 1)")
+    args = parser.parse_args(argv)
+    uvicorn.run("rating_service:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())